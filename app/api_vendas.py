@@ -0,0 +1,266 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from datetime import date
+
+from psycopg2 import DataError as DataErrorDriver, IntegrityError as IntegrityErrorDriver
+from sqlalchemy.exc import DataError, IntegrityError
+
+from models.models import Venda
+from utils.db import engine
+from utils.estoque import movimentar
+
+# Serviço de ingestão de vendas para os PDVs: ASGI puro (uvicorn api_vendas:app), sem framework.
+#   POST /vendas    uma venda {"produto_id", "quantidade"[, "data_venda"]} ou uma lista delas -> 202
+#   GET  /metricas  vazão, fila e lotes gravados
+#   GET  /saude     200 se a última gravação deu certo, 503 se o banco está falhando
+# As vendas aceitas entram numa fila em memória; um único gravador esvazia a fila em lotes limitados por
+# tamanho (INGESTAO_LOTE_MAX) ou por tempo (INGESTAO_INTERVALO_MS), com COPY em vendas e a baixa no livro de
+# estoque na mesma transação. Fila cheia -> 429 com Retry-After, banco fora -> 503: o PDV reenvia depois.
+# Lote recusado pelo banco por causa dos dados (DataError/IntegrityError) não é repetido: é dividido ao meio até
+# isolar as vendas culpadas, que vão para o log e para as métricas (ultimas_rejeitadas) e são descartadas.
+# O cache de leitura é por processo: o Streamlit enxerga as vendas novas quando o TTL de vendas expira.
+
+LOTE_MAX = int(os.getenv("INGESTAO_LOTE_MAX", "5000"))
+INTERVALO_S = float(os.getenv("INGESTAO_INTERVALO_MS", "200")) / 1000
+FILA_MAX = int(os.getenv("INGESTAO_FILA_MAX", "100000"))
+VENDAS_POR_REQUISICAO = int(os.getenv("INGESTAO_VENDAS_POR_REQUISICAO", "10000"))
+JANELA_METRICAS_S = 60
+ESPERA_MAX_FALHA_S = 30
+ESPERA_ENCERRAR_S = float(os.getenv("INGESTAO_ESPERA_ENCERRAR_S", "30"))
+INT4_MAX = 2**31 - 1
+ERROS_DE_DADOS = (DataError, IntegrityError, DataErrorDriver, IntegrityErrorDriver)
+
+COLUNAS = [Venda.produto_id.key, Venda.quantidade.key, Venda.data_venda.key]
+COPY_VENDAS = f"COPY {Venda.__tablename__} ({', '.join(COLUNAS)}) FROM STDIN WITH (FORMAT csv)"
+
+log = logging.getLogger("api_vendas")
+
+
+class VendaInvalida(ValueError):
+    pass
+
+
+def _validar(venda, hoje: date) -> tuple:
+    if not isinstance(venda, dict):
+        raise VendaInvalida("cada venda deve ser um objeto")
+    produto_id, quantidade = venda.get("produto_id"), venda.get("quantidade")
+    # colunas INT do Postgres: fora do intervalo o COPY falharia depois do 202
+    if not isinstance(produto_id, int) or isinstance(produto_id, bool) or not 0 < produto_id <= INT4_MAX:
+        raise VendaInvalida(f"produto_id deve ser um inteiro entre 1 e {INT4_MAX}")
+    if not isinstance(quantidade, int) or isinstance(quantidade, bool) or not 0 < quantidade <= INT4_MAX:
+        raise VendaInvalida(f"quantidade deve ser um inteiro entre 1 e {INT4_MAX}")
+    try:
+        data_venda = date.fromisoformat(venda["data_venda"]) if venda.get("data_venda") else hoje
+    except (TypeError, ValueError):
+        raise VendaInvalida("data_venda deve estar no formato AAAA-MM-DD") from None
+    return produto_id, quantidade, data_venda
+
+
+def _gravar_lote(lote: list) -> dict:
+    # roda numa thread: COPY das vendas de produtos existentes + um movimento de venda por produto, tudo numa
+    # transação. Vendas de produtos inexistentes são descartadas (a resposta 202 já foi dada) e contadas
+    with engine.begin() as conn:
+        with conn.connection.cursor() as cur:
+            cur.execute("SELECT id FROM produtos WHERE id = ANY(%s)", (sorted({v[0] for v in lote}),))
+            existentes = {linha[0] for linha in cur}
+            validas = [v for v in lote if v[0] in existentes]
+            if validas:
+                buffer = io.StringIO()
+                buffer.writelines(f"{p},{q},{d.isoformat()}\n" for p, q, d in validas)
+                buffer.seek(0)
+                cur.copy_expert(COPY_VENDAS, buffer)
+        vendidos = defaultdict(int)
+        for produto_id, quantidade, _ in validas:
+            vendidos[produto_id] -= quantidade
+        movimentar(conn, vendidos.items(), "venda")
+    return {"gravadas": len(validas), "descartadas": len(lote) - len(validas)}
+
+
+class Ingestao:
+    def __init__(self, lote_max: int = LOTE_MAX, intervalo_s: float = INTERVALO_S, fila_max: int = FILA_MAX):
+        self.lote_max, self.intervalo_s, self.fila_max = lote_max, intervalo_s, fila_max
+        self.fila = None
+        self.gravador = None
+        self.falhando = False
+        self.iniciado_em = time.monotonic()
+        self.contadores = {"recebidas": 0, "gravadas": 0, "descartadas": 0, "rejeitadas_pelo_banco": 0,
+                           "recusadas_fila_cheia": 0, "recusadas_banco_fora": 0, "lotes": 0, "falhas": 0}
+        self.ultimo_erro = None
+        self.rejeitadas = deque(maxlen=20)  # últimas vendas descartadas por erro de dados, com o erro
+        self.gravacoes = deque()  # (instante, vendas gravadas, ms do lote) dentro da janela de métricas
+
+    async def iniciar(self):
+        self.fila = asyncio.Queue(maxsize=self.fila_max)
+        self.gravador = asyncio.create_task(self._gravar_sempre())
+
+    async def encerrar(self):
+        # drena o que já foi aceito antes de sair; com o banco fora, desiste depois de ESPERA_ENCERRAR_S
+        try:
+            await asyncio.wait_for(self.fila.join(), ESPERA_ENCERRAR_S)
+        except asyncio.TimeoutError:
+            log.error("encerrando com %d venda(s) não gravada(s): %s", self.fila.qsize(), self.ultimo_erro)
+        self.gravador.cancel()
+
+    def aceitar(self, vendas: list) -> int:
+        # tudo ou nada: se o lote não cabe na fila, nenhuma venda dele entra
+        if self.falhando:
+            self.contadores["recusadas_banco_fora"] += len(vendas)
+            raise RuntimeError("banco indisponível")
+        if self.fila.qsize() + len(vendas) > self.fila_max:
+            self.contadores["recusadas_fila_cheia"] += len(vendas)
+            raise OverflowError("fila cheia")
+        for venda in vendas:
+            self.fila.put_nowait(venda)
+        self.contadores["recebidas"] += len(vendas)
+        return self.fila.qsize()
+
+    async def _proximo_lote(self) -> list:
+        lote = [await self.fila.get()]
+        prazo = time.monotonic() + self.intervalo_s
+        while len(lote) < self.lote_max:
+            while len(lote) < self.lote_max and not self.fila.empty():
+                lote.append(self.fila.get_nowait())
+            restante = prazo - time.monotonic()
+            if len(lote) >= self.lote_max or restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self.fila.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _gravar(self, lote: list) -> dict:
+        # repete falhas transitórias (conexão, timeout) com espera crescente, mantendo o lote; erro de dados
+        # divide o lote até sobrar a venda culpada, que é descartada
+        espera = self.intervalo_s
+        while True:
+            try:
+                resultado = await asyncio.to_thread(_gravar_lote, lote)
+            except ERROS_DE_DADOS as e:
+                self.falhando = False
+                if len(lote) > 1:
+                    meio = len(lote) // 2
+                    primeira, segunda = await self._gravar(lote[:meio]), await self._gravar(lote[meio:])
+                    return {chave: primeira[chave] + segunda[chave] for chave in primeira}
+                erro = f"{type(e).__name__}: {e}".strip()
+                log.error("venda descartada pelo banco %s: %s", lote[0], erro)
+                self.rejeitadas.append({"venda": lote[0], "erro": erro})
+                return {"gravadas": 0, "descartadas": 0, "rejeitadas_pelo_banco": 1}
+            except Exception as e:
+                # o lote fica retido e é regravado; enquanto isso novas vendas recebem 503
+                self.falhando, self.ultimo_erro = True, f"{type(e).__name__}: {e}"
+                self.contadores["falhas"] += 1
+                log.exception("falha ao gravar lote de %d vendas; nova tentativa em %.1fs", len(lote), espera)
+                await asyncio.sleep(espera)
+                espera = min(2 * espera, ESPERA_MAX_FALHA_S)
+                continue
+            self.falhando = False
+            return {**resultado, "rejeitadas_pelo_banco": 0}
+
+    async def _gravar_sempre(self):
+        while True:
+            lote = await self._proximo_lote()
+            inicio = time.perf_counter()
+            resultado = await self._gravar(lote)
+            self.contadores["lotes"] += 1
+            for chave, total in resultado.items():
+                self.contadores[chave] += total
+            self.gravacoes.append((time.monotonic(), resultado["gravadas"], 1000 * (time.perf_counter() - inicio)))
+            for _ in lote:
+                self.fila.task_done()
+
+    def metricas(self) -> dict:
+        agora = time.monotonic()
+        while self.gravacoes and self.gravacoes[0][0] < agora - JANELA_METRICAS_S:
+            self.gravacoes.popleft()
+        janela = min(JANELA_METRICAS_S, agora - self.iniciado_em) or 1
+        tempos = sorted(ms for _, _, ms in self.gravacoes)
+        return {
+            **self.contadores,
+            "fila": self.fila.qsize() if self.fila else 0,
+            "fila_max": self.fila_max,
+            "falhando": self.falhando,
+            "ultimo_erro": self.ultimo_erro,
+            "ultimas_rejeitadas": list(self.rejeitadas),
+            "vendas_por_segundo": round(sum(n for _, n, _ in self.gravacoes) / janela, 1),
+            "lote_mediano_ms": round(tempos[len(tempos) // 2], 2) if tempos else None,
+            "lote_max_ms": round(tempos[-1], 2) if tempos else None,
+        }
+
+
+async def _ler_corpo(receive) -> bytes:
+    corpo = b""
+    while True:
+        mensagem = await receive()
+        corpo += mensagem.get("body", b"")
+        if not mensagem.get("more_body"):
+            return corpo
+
+
+async def _responder(send, status: int, conteudo: dict, cabecalhos: list | None = None):
+    corpo = json.dumps(conteudo, ensure_ascii=False, default=str).encode("utf-8")
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json; charset=utf-8"), (b"content-length", str(len(corpo)).encode()),
+        *(cabecalhos or []),
+    ]})
+    await send({"type": "http.response.body", "body": corpo})
+
+
+def criar_app(ingestao: Ingestao | None = None):
+    ingestao = ingestao or Ingestao()
+
+    async def receber_vendas(receive, send):
+        try:
+            dados = json.loads(await _ler_corpo(receive))
+        except ValueError:
+            return await _responder(send, 400, {"erro": "corpo deve ser JSON"})
+        vendas = dados if isinstance(dados, list) else [dados]
+        if len(vendas) > VENDAS_POR_REQUISICAO:
+            return await _responder(send, 413, {"erro": f"no máximo {VENDAS_POR_REQUISICAO} vendas por requisição"})
+        hoje = date.today()
+        try:
+            validas = [_validar(venda, hoje) for venda in vendas]
+        except VendaInvalida as e:
+            return await _responder(send, 422, {"erro": str(e)})
+        try:
+            fila = ingestao.aceitar(validas)
+        except OverflowError:
+            return await _responder(send, 429, {"erro": "fila cheia, tente novamente"}, [(b"retry-after", b"1")])
+        except RuntimeError:
+            return await _responder(send, 503, {"erro": "banco indisponível, tente novamente"},
+                                    [(b"retry-after", b"5")])
+        await _responder(send, 202, {"aceitas": len(validas), "fila": fila})
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                mensagem = await receive()
+                if mensagem["type"] == "lifespan.startup":
+                    await ingestao.iniciar()
+                    await send({"type": "lifespan.startup.complete"})
+                elif mensagem["type"] == "lifespan.shutdown":
+                    await ingestao.encerrar()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        rota = (scope["method"], scope["path"].rstrip("/"))
+        if rota == ("POST", "/vendas"):
+            await receber_vendas(receive, send)
+        elif rota == ("GET", "/metricas"):
+            await _responder(send, 200, ingestao.metricas())
+        elif rota == ("GET", "/saude"):
+            await _responder(send, 503 if ingestao.falhando else 200, {"falhando": ingestao.falhando})
+        else:
+            await _responder(send, 404, {"erro": "rota não encontrada"})
+
+    app.ingestao = ingestao
+    return app
+
+
+app = criar_app()
@@ -0,0 +1,142 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+
+from models.models import Produto, Venda, Fornecedor, Pedido
+from utils.db import SessionLocal
+from utils import services
+from utils.cubo import carregar_cubo_vendas
+from utils.reposicao import planejar_reposicao
+from utils.demanda import demanda_atual
+
+# Mede as leituras e escritas da camada de serviço contra o Postgres local.
+# Leituras cacheadas são chamadas pela função original (.sem_cache) para medir o banco, não o cache.
+
+
+def _sem_cache(funcao):
+    return getattr(funcao, "sem_cache", funcao)
+
+
+def _relatorio_vendas(db):
+    limite = date.today() - timedelta(days=30)
+    return db.query(Produto.nome, Venda.data_venda, Venda.quantidade, Fornecedor.nome).join(Venda).join(Fornecedor) \
+        .filter(Venda.data_venda.between(limite, date.today())).all()
+
+
+def _ciclo_produto(db):
+    produto = services.criar_produto(db, "Produto Benchmark", 10, 9.9)
+    services.atualizar_produto(db, produto.id, "Produto Benchmark", 20, 10.9)
+    services.deletar_produto(db, produto.id)
+
+
+def _ciclo_pedido(db, produto_id, fornecedor_id):
+    pedido = services.criar_pedido(db, produto_id, fornecedor_id, 5)
+    services.atualizar_pedido(db, pedido.id, 6, "enviado")
+    # volta a pendente (estorno do recebimento) antes de remover: o ciclo não pode inflar o estoque do produto
+    services.atualizar_pedido(db, pedido.id, status="pendente")
+    services.deletar_pedido(db, pedido.id)
+
+
+def _pedidos_em_lote(db, produto_ids):
+    criados = services.criar_pedidos_em_lote(db, ((produto_id, 5) for produto_id in produto_ids))
+    services.deletar_pedido(db, [pedido_id for ids in criados.values() for pedido_id in ids])
+
+
+def casos(db) -> dict:
+    produto_id = db.query(func.min(Produto.id)).scalar()
+    fornecedor_id = db.query(func.min(Fornecedor.id)).scalar()
+    ultimo_pedido = db.query(func.max(Pedido.id)).scalar() or 0
+    lista = {
+        "get_produtos": lambda: _sem_cache(services.get_produtos)(db),
+        "get_fornecedores": lambda: _sem_cache(services.get_fornecedores)(db),
+        "calcular_media_vendas": lambda: _sem_cache(services.calcular_media_vendas)(db, produto_id),
+        "carregar_cubo_vendas_30d": lambda: _sem_cache(carregar_cubo_vendas)(db, 30),
+        "carregar_cubo_vendas_365d": lambda: _sem_cache(carregar_cubo_vendas)(db, 365),
+        "planejar_reposicao": lambda: _sem_cache(planejar_reposicao)(db),
+        "demanda_atual": lambda: _sem_cache(demanda_atual)(db),
+        "contar_pedidos_por_status": lambda: _sem_cache(services.contar_pedidos_por_status)(db),
+        "listar_pedidos_primeira_pagina": lambda: _sem_cache(services.listar_pedidos)(db),
+        "listar_pedidos_ultima_pagina": lambda: _sem_cache(services.listar_pedidos)(db, apos_id=ultimo_pedido - 50),
+        "listar_pedidos_pendentes": lambda: _sem_cache(services.listar_pedidos)(db, status="pendente"),
+        "listar_produtos_prefixo": lambda: _sem_cache(services.listar_produtos)(db, prefixo_nome="Produto"),
+        "relatorio_vendas_30d": lambda: _relatorio_vendas(db),
+        "crud_produto": lambda: _ciclo_produto(db),
+    }
+    if produto_id and fornecedor_id:
+        lista["crud_pedido"] = lambda: _ciclo_pedido(db, produto_id, fornecedor_id)
+    com_fornecedor = [p for (p,) in db.query(Produto.id).filter(Produto.fornecedor_id.isnot(None)).limit(2000)]
+    if com_fornecedor:
+        lista["pedidos_em_lote_2000"] = lambda: _pedidos_em_lote(db, com_fornecedor)
+    return lista
+
+
+def medir(funcao, repeticoes: int) -> dict:
+    funcao()  # aquecimento: planos, conexões e caches do Postgres
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(1000 * (time.perf_counter() - inicio))
+    tempos.sort()
+    return {
+        "min_ms": round(tempos[0], 3),
+        "mediana_ms": round(statistics.median(tempos), 3),
+        "p95_ms": round(tempos[min(len(tempos) - 1, int(0.95 * len(tempos)))], 3),
+        "repeticoes": repeticoes,
+    }
+
+
+def executar(repeticoes: int, filtro: str | None = None) -> dict:
+    resultados = {}
+    with SessionLocal() as db:
+        meta = {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "maquina": platform.node(),
+            "produtos": db.query(func.count(Produto.id)).scalar(),
+            "fornecedores": db.query(func.count(Fornecedor.id)).scalar(),
+            "pedidos": db.query(func.count(Pedido.id)).scalar(),
+            "vendas": db.query(func.count(Venda.id)).scalar(),
+        }
+        for nome, funcao in casos(db).items():
+            if filtro and filtro not in nome:
+                continue
+            resultados[nome] = medir(funcao, repeticoes)
+            print(f"{nome:34} mediana={resultados[nome]['mediana_ms']:>10.2f}ms p95={resultados[nome]['p95_ms']:>10.2f}ms")
+    return {"meta": meta, "resultados": resultados}
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> list:
+    regressoes = []
+    for nome, medida in atual["resultados"].items():
+        referencia = baseline["resultados"].get(nome)
+        if referencia and medida["mediana_ms"] > referencia["mediana_ms"] * (1 + tolerancia):
+            regressoes.append(f"{nome}: {referencia['mediana_ms']:.2f}ms -> {medida['mediana_ms']:.2f}ms")
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da camada de serviço")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--filtro", help="roda só os casos cujo nome contém este texto")
+    parser.add_argument("--salvar", help="grava os resultados em JSON (ex.: bench/baseline.json)")
+    parser.add_argument("--comparar", help="baseline JSON; sai com código 1 se alguma mediana piorar além da tolerância")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    resultado = executar(args.repeticoes, args.filtro)
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(resultado, json.load(arquivo), args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO {regressao}")
+        sys.exit(1 if regressoes else 0)
@@ -0,0 +1,93 @@
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+from sqlalchemy import select
+
+from models.models import Produto
+from utils.db import SessionLocal
+
+# Carga no serviço de ingestão (api_vendas.py) rodando contra o Postgres local: N PDVs simulados enviam
+# lotes de vendas em loop; mede aceitas/s, recusas por backpressure (429/503) e a vazão gravada em /metricas.
+
+
+def _pdv(url, produto_ids, vendas_por_requisicao: int, fim: float, semente: int, medidas: dict, trava):
+    rng = np.random.default_rng(semente)
+    partes = urlsplit(url)
+    conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+    latencias, status = [], {}
+    while time.monotonic() < fim:
+        vendas = [{"produto_id": int(p), "quantidade": int(q)} for p, q in zip(
+            rng.choice(produto_ids, vendas_por_requisicao), rng.integers(1, 5, vendas_por_requisicao))]
+        inicio = time.perf_counter()
+        conexao.request("POST", "/vendas", json.dumps(vendas), {"Content-Type": "application/json"})
+        resposta = conexao.getresponse()
+        resposta.read()
+        latencias.append(1000 * (time.perf_counter() - inicio))
+        status[resposta.status] = status.get(resposta.status, 0) + 1
+        if resposta.status in (429, 503):
+            time.sleep(float(resposta.getheader("Retry-After", "1")))
+    conexao.close()
+    with trava:
+        medidas["latencias"].extend(latencias)
+        for codigo, total in status.items():
+            medidas["status"][codigo] = medidas["status"].get(codigo, 0) + total
+
+
+def _metricas(url) -> dict:
+    partes = urlsplit(url)
+    conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=10)
+    conexao.request("GET", "/metricas")
+    return json.loads(conexao.getresponse().read())
+
+
+def executar(url: str, pdvs: int, segundos: float, vendas_por_requisicao: int, produtos: int) -> dict:
+    with SessionLocal() as db:
+        produto_ids = np.array(db.execute(select(Produto.id).order_by(Produto.id).limit(produtos)).scalars().all())
+    antes = _metricas(url)
+    medidas, trava = {"latencias": [], "status": {}}, threading.Lock()
+    fim = time.monotonic() + segundos
+    threads = [threading.Thread(target=_pdv, args=(url, produto_ids, vendas_por_requisicao, fim, i, medidas, trava))
+               for i in range(pdvs)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    while _metricas(url)["fila"]:  # espera o gravador esvaziar a fila
+        time.sleep(0.1)
+    depois = _metricas(url)
+
+    latencias = sorted(medidas["latencias"]) or [0.0]
+    aceitas = medidas["status"].get(202, 0) * vendas_por_requisicao
+    return {
+        "pdvs": pdvs,
+        "aceitas_por_segundo": aceitas / duracao,
+        "gravadas": depois["gravadas"] - antes["gravadas"],
+        "mediana_ms": statistics.median(latencias),
+        "p95_ms": latencias[min(len(latencias) - 1, int(0.95 * len(latencias)))],
+        "status": medidas["status"],
+        "lote_mediano_ms": depois["lote_mediano_ms"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga no serviço de ingestão de vendas")
+    parser.add_argument("--url", default="http://localhost:8600")
+    parser.add_argument("--pdvs", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--vendas", type=int, default=20, help="vendas por requisição")
+    parser.add_argument("--produtos", type=int, default=1000)
+    args = parser.parse_args()
+
+    for pdvs in args.pdvs:
+        r = executar(args.url, pdvs, args.segundos, args.vendas, args.produtos)
+        print(f"{r['pdvs']:3} PDVs: {r['aceitas_por_segundo']:8.0f} vendas/s aceitas, {r['gravadas']} gravadas "
+              f"mediana={r['mediana_ms']:6.2f}ms p95={r['p95_ms']:6.2f}ms lote={r['lote_mediano_ms']}ms "
+              f"status={r['status']}")
@@ -0,0 +1,139 @@
+import argparse
+import io
+import statistics
+import threading
+import time
+from datetime import date
+
+import numpy as np
+from psycopg2 import errors
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from models.models import Produto, MovimentoEstoque
+from utils.db import SessionLocal, POOL_CONFIG, engine
+from utils.estoque import movimentar
+
+# Vazão sustentada do livro de estoque com muitos escritores concorrentes: cada thread aplica movimentos
+# multi-SKU (SKUs sorteados com viés Pareto, para haver disputa pelas mesmas linhas) em transações próprias.
+# No fim confere que nenhum update se perdeu: variação do estoque == soma dos movimentos gravados.
+# Com --importadores, threads extras repetem o padrão de importar_vendas/api_vendas (COPY em vendas, que toma
+# KEY SHARE nos produtos pela FK, e só no fim o movimento de venda) e desfazem a transação: medem a disputa
+# entre importações e movimentos sem alterar os dados.
+
+
+def _escritor(produto_ids, pesos, skus_por_movimento: int, fim: float, semente: int, medidas: dict, trava):
+    rng = np.random.default_rng(semente)
+    latencias, deadlocks, movimentos = [], 0, 0
+    with SessionLocal() as db:
+        while time.monotonic() < fim:
+            skus = rng.choice(produto_ids, skus_por_movimento, replace=False, p=pesos)
+            itens = [(int(sku), int(rng.integers(-5, 6)) or 1) for sku in skus]
+            inicio = time.perf_counter()
+            try:
+                movimentar(db, itens, "ajuste")
+                db.commit()
+                movimentos += 1
+                latencias.append(1000 * (time.perf_counter() - inicio))
+            except OperationalError as e:
+                db.rollback()
+                if isinstance(e.orig, errors.DeadlockDetected):
+                    deadlocks += 1
+                else:
+                    raise
+    with trava:
+        medidas["latencias"].extend(latencias)
+        medidas["deadlocks"] += deadlocks
+        medidas["movimentos"] += movimentos
+
+
+def _importador(produto_ids, pesos, linhas_por_lote: int, fim: float, semente: int, medidas: dict, trava):
+    rng = np.random.default_rng(semente)
+    lotes, deadlocks = 0, 0
+    while time.monotonic() < fim:
+        skus = rng.choice(produto_ids, linhas_por_lote, p=pesos)
+        conn = engine.connect()
+        transacao = conn.begin()
+        try:
+            with conn.connection.cursor() as cur:
+                buffer = io.StringIO("".join(f"{int(sku)},1,{date.today().isoformat()}\n" for sku in skus))
+                cur.copy_expert("COPY vendas (produto_id, quantidade, data_venda) FROM STDIN WITH (FORMAT csv)", buffer)
+            movimentar(conn, ((int(sku), -1) for sku in skus), "venda")
+            lotes += 1
+        except OperationalError as e:
+            if not isinstance(e.orig, errors.DeadlockDetected):
+                raise
+            deadlocks += 1
+        finally:
+            transacao.rollback()
+            conn.close()
+    with trava:
+        medidas["lotes_importados"] += lotes
+        medidas["deadlocks_importacao"] += deadlocks
+
+
+def executar(escritores: int, segundos: float, skus_por_movimento: int, produtos: int, importadores: int = 0,
+             linhas_por_lote: int = 1000) -> dict:
+    with SessionLocal() as db:
+        produto_ids = np.array(db.execute(select(Produto.id).order_by(Produto.id).limit(produtos)).scalars().all())
+        estoque_inicial = db.execute(select(func.sum(Produto.estoque_atual)).where(Produto.id.in_(produto_ids.tolist()))).scalar()
+        marca = db.execute(select(func.coalesce(func.max(MovimentoEstoque.id), 0))).scalar()
+    pesos = np.random.default_rng(0).pareto(1.2, len(produto_ids)) + 0.01
+    pesos /= pesos.sum()
+
+    medidas, trava = {"latencias": [], "deadlocks": 0, "movimentos": 0, "lotes_importados": 0,
+                      "deadlocks_importacao": 0}, threading.Lock()
+    fim = time.monotonic() + segundos
+    threads = [
+        threading.Thread(target=_escritor, args=(produto_ids, pesos, skus_por_movimento, fim, i, medidas, trava))
+        for i in range(escritores)
+    ] + [
+        threading.Thread(target=_importador, args=(produto_ids, pesos, linhas_por_lote, fim, 1000 + i, medidas, trava))
+        for i in range(importadores)
+    ]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    with SessionLocal() as db:
+        estoque_final = db.execute(select(func.sum(Produto.estoque_atual)).where(Produto.id.in_(produto_ids.tolist()))).scalar()
+        movimentado = db.execute(select(func.coalesce(func.sum(MovimentoEstoque.quantidade), 0))
+                                 .where(MovimentoEstoque.id > marca, MovimentoEstoque.tipo == "ajuste")).scalar()
+    latencias = sorted(medidas["latencias"]) or [0.0]
+    return {
+        "escritores": escritores,
+        "movimentos": medidas["movimentos"],
+        "movimentos_por_segundo": medidas["movimentos"] / duracao,
+        "skus_por_segundo": medidas["movimentos"] * skus_por_movimento / duracao,
+        "mediana_ms": statistics.median(latencias),
+        "p95_ms": latencias[min(len(latencias) - 1, int(0.95 * len(latencias)))],
+        "deadlocks": medidas["deadlocks"],
+        "lotes_importados": medidas["lotes_importados"],
+        "deadlocks_importacao": medidas["deadlocks_importacao"],
+        "consistente": estoque_final - estoque_inicial == movimentado,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de escritores concorrentes no livro de estoque")
+    parser.add_argument("--escritores", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--skus", type=int, default=5, help="SKUs por movimento (uma transação)")
+    parser.add_argument("--produtos", type=int, default=1000, help="tamanho do conjunto de SKUs disputado")
+    parser.add_argument("--importadores", type=int, default=0, help="threads simulando importações (COPY + venda)")
+    parser.add_argument("--linhas", type=int, default=1000, help="vendas por lote de cada importador")
+    args = parser.parse_args()
+
+    limite = POOL_CONFIG["pool_size"] + POOL_CONFIG["max_overflow"]
+    for escritores in args.escritores:
+        if escritores + args.importadores > limite:
+            print(f"{escritores} escritores excedem o pool ({limite} conexões); ajuste DB_POOL_SIZE/DB_MAX_OVERFLOW")
+            continue
+        r = executar(escritores, args.segundos, args.skus, args.produtos, args.importadores, args.linhas)
+        print(f"{r['escritores']:3} escritores: {r['movimentos_por_segundo']:8.0f} mov/s {r['skus_por_segundo']:8.0f} SKU/s "
+              f"mediana={r['mediana_ms']:6.2f}ms p95={r['p95_ms']:6.2f}ms deadlocks={r['deadlocks']} "
+              f"importações={r['lotes_importados']} (deadlocks={r['deadlocks_importacao']}) "
+              f"{'consistente' if r['consistente'] else 'INCONSISTENTE'}")
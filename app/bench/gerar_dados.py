@@ -0,0 +1,153 @@
+import argparse
+import io
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.db import engine
+from utils.cache import invalidar
+from utils.utils import PESOS_CNPJ_DV1, PESOS_CNPJ_DV2
+
+# Gera uma base sintética escalável direto via COPY:
+#   fornecedores -> produtos com fan-out em lei de potência (poucos fornecedores concentram o catálogo)
+#   produtos     -> popularidade Pareto (poucos SKUs concentram as vendas)
+#   vendas       -> sazonalidade semanal + anual, tendência leve e quantidades Poisson
+
+SEGMENTOS = ["Materiais de Construção", "Ferramentas e Equipamentos", "Elétrica", "Hidráulica", "Acabamento"]
+FATOR_DIA_SEMANA = np.array([1.0, 1.05, 1.1, 1.1, 1.25, 1.4, 0.5])  # segunda ... domingo
+LINHAS_POR_COPY = 500_000
+
+
+def _cnpjs(raizes: np.ndarray) -> list:
+    # raiz de 8 dígitos única por fornecedor + filial "0001" + dígitos verificadores válidos
+    base = np.zeros((len(raizes), 12), dtype=np.int64)
+    for posicao in range(8):
+        base[:, 7 - posicao] = raizes // 10 ** posicao % 10
+    base[:, 11] = 1
+    resto1 = base @ np.array(PESOS_CNPJ_DV1) % 11
+    dv1 = np.where(resto1 < 2, 0, 11 - resto1)
+    com_dv1 = np.column_stack([base, dv1])
+    resto2 = com_dv1 @ np.array(PESOS_CNPJ_DV2) % 11
+    dv2 = np.where(resto2 < 2, 0, 11 - resto2)
+    digitos = np.column_stack([com_dv1, dv2]).astype(np.uint8) + 48
+    return [bytes(linha).decode("ascii") for linha in digitos]
+
+
+def _copiar(cur, tabela: str, df: pd.DataFrame):
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {tabela} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _sazonalidade(datas: pd.DatetimeIndex, rng) -> np.ndarray:
+    semanal = FATOR_DIA_SEMANA[datas.dayofweek]
+    anual = 1 + 0.3 * np.sin(2 * np.pi * (datas.dayofyear - 80) / 365.25)
+    tendencia = np.linspace(0.9, 1.1, len(datas))
+    ruido = rng.lognormal(0, 0.1, len(datas))
+    pesos = semanal * anual * tendencia * ruido
+    return pesos / pesos.sum()
+
+
+def gerar(fornecedores: int, produtos: int, vendas: int, dias: int, pedidos: int, semente: int = 42,
+          limpar: bool = False) -> dict:
+    rng = np.random.default_rng(semente)
+    fim = date.today()
+    inicio = fim - timedelta(days=dias - 1)
+    datas = pd.date_range(inicio, fim, freq="D")
+    tempos = {}
+
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cur:
+            if limpar:
+                cur.execute("TRUNCATE vendas, pedidos, produtos, fornecedores RESTART IDENTITY CASCADE")
+            cur.execute("SELECT vendas_garantir_particoes(%s, %s)", (inicio, fim))
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM fornecedores")
+            primeiro_fornecedor = cur.fetchone()[0] + 1
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM produtos")
+            primeiro_produto = cur.fetchone()[0] + 1
+
+            t = time.perf_counter()
+            _copiar(cur, "fornecedores", pd.DataFrame({
+                "id": np.arange(fornecedores) + primeiro_fornecedor,
+                "nome": [f"Fornecedor Sintetico {i}" for i in range(fornecedores)],
+                "cnpj": _cnpjs(np.arange(fornecedores) + primeiro_fornecedor),
+                "email": [f"contato{i}@fornecedor{i}.com.br" for i in range(fornecedores)],
+                "telefone": rng.integers(1_100_000_000, 9_999_999_999, fornecedores).astype(str),
+                "segmento": rng.choice(SEGMENTOS, fornecedores),
+                "prazo_entrega_dias": rng.integers(2, 30, fornecedores),
+            }))
+            tempos["fornecedores"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            fan_out = rng.zipf(1.6, fornecedores).astype(np.float64)
+            fornecedor_de = rng.choice(fornecedores, produtos, p=fan_out / fan_out.sum()) + primeiro_fornecedor
+            _copiar(cur, "produtos", pd.DataFrame({
+                "id": np.arange(produtos) + primeiro_produto,
+                "nome": [f"Produto Sintetico {i}" for i in range(produtos)],
+                "estoque_atual": rng.integers(0, 500, produtos),
+                "preco": rng.lognormal(3.5, 1.0, produtos).round(2),
+                "fornecedor_id": fornecedor_de,
+            }))
+            # ids explícitos (as vendas referenciam por posição); as sequências avançam junto
+            for tabela in ("fornecedores", "produtos"):
+                cur.execute(f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), (SELECT MAX(id) FROM {tabela}))")
+            tempos["produtos"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            popularidade = rng.pareto(1.2, produtos) + 0.01
+            popularidade /= popularidade.sum()
+            media_unidades = rng.uniform(1, 8, produtos)
+            pesos_dia = _sazonalidade(datas, rng)
+            restantes = vendas
+            while restantes > 0:
+                lote = min(restantes, LINHAS_POR_COPY)
+                produto = rng.choice(produtos, lote, p=popularidade)
+                _copiar(cur, "vendas", pd.DataFrame({
+                    "produto_id": produto + primeiro_produto,
+                    "quantidade": rng.poisson(media_unidades[produto]) + 1,
+                    "data_venda": datas[rng.choice(len(datas), lote, p=pesos_dia)],
+                }))
+                restantes -= lote
+            tempos["vendas"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            produto_pedido = rng.integers(0, produtos, pedidos)
+            _copiar(cur, "pedidos", pd.DataFrame({
+                "produto_id": produto_pedido + primeiro_produto,
+                "fornecedor_id": fornecedor_de[produto_pedido],
+                "quantidade": rng.integers(1, 200, pedidos),
+                "status": rng.choice(["pendente", "enviado", "cancelado"], pedidos, p=[0.5, 0.4, 0.1]),
+                "data_pedido": datas[rng.integers(0, len(datas), pedidos)],
+            }))
+            tempos["pedidos"] = time.perf_counter() - t
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("ANALYZE")
+    invalidar("fornecedores", "produtos", "vendas", "pedidos")
+    return tempos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos para testes de escala")
+    parser.add_argument("--fornecedores", type=int, default=200)
+    parser.add_argument("--produtos", type=int, default=20_000)
+    parser.add_argument("--vendas", type=int, default=1_000_000)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--pedidos", type=int, default=50_000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--limpar", action="store_true", help="apaga os dados existentes antes de gerar")
+    args = parser.parse_args()
+
+    tempos = gerar(args.fornecedores, args.produtos, args.vendas, args.dias, args.pedidos, args.semente, args.limpar)
+    for tabela, segundos in tempos.items():
+        print(f"{tabela:13} {segundos:8.2f}s")
@@ -0,0 +1,79 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Mede o cold start do app: cada repetição importa o módulo num interpretador novo.
+# Falha se o import puxar uma dependência pesada que só as páginas de análise deveriam carregar,
+# ou se a mediana passar de --limite-ms.
+
+APP_DIR = Path(__file__).resolve().parent.parent
+PESADOS = ["pandas", "numpy", "pyarrow", "plotly", "matplotlib", "seaborn", "sklearn", "scipy"]
+SONDA = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+ms = 1000 * (time.perf_counter() - inicio)
+print(json.dumps({{"ms": ms, "modulos": [m for m in {pesados!r} if m in sys.modules]}}))
+"""
+
+
+def _rodar(codigo: str, *opcoes: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *opcoes, "-c", codigo], cwd=APP_DIR, capture_output=True, text=True,
+                          check=True)
+
+
+def medir(modulo: str, repeticoes: int) -> dict:
+    # o que o próprio streamlit/sqlalchemy já carregam não é culpa do app
+    base = json.loads(_rodar(SONDA.format(modulo="streamlit, sqlalchemy", pesados=PESADOS)).stdout.splitlines()[-1])
+    tempos, carregados = [], []
+    for _ in range(repeticoes):
+        resultado = json.loads(_rodar(SONDA.format(modulo=modulo, pesados=PESADOS)).stdout.splitlines()[-1])
+        tempos.append(resultado["ms"])
+        carregados = resultado["modulos"]
+    return {
+        "modulo": modulo,
+        "mediana_ms": round(statistics.median(tempos), 1),
+        "min_ms": round(min(tempos), 1),
+        "base_ms": round(base["ms"], 1),
+        "pesados": [m for m in carregados if m not in base["modulos"]],
+    }
+
+
+def mais_lentos(modulo: str, quantidade: int = 15) -> list:
+    # saída de -X importtime: "import time: self [us] | cumulative | nome"
+    linhas = _rodar(f"import {modulo}", "-X", "importtime").stderr.splitlines()
+    medidas = []
+    for linha in linhas[1:]:
+        if not linha.startswith("import time:"):
+            continue
+        _, _, cumulativo, nome = (parte.strip() for parte in linha.replace("import time:", "|").split("|"))
+        medidas.append((int(cumulativo) / 1000, nome))
+    return sorted(medidas, reverse=True)[:quantidade]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo de importação do app (cold start)")
+    parser.add_argument("modulos", nargs="*", default=["utils.view", "main"])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--limite-ms", type=float, help="falha se a mediana de algum módulo passar deste valor")
+    parser.add_argument("--detalhe", action="store_true", help="lista os imports mais lentos de cada módulo")
+    args = parser.parse_args()
+
+    falhou = False
+    for modulo in args.modulos:
+        medida = medir(modulo, args.repeticoes)
+        print(f"{modulo:12} mediana={medida['mediana_ms']:8.1f}ms min={medida['min_ms']:8.1f}ms "
+              f"(streamlit+sqlalchemy: {medida['base_ms']:.1f}ms)")
+        if medida["pesados"]:
+            print(f"  importa no carregamento: {', '.join(medida['pesados'])}")
+            falhou = True
+        if args.limite_ms and medida["mediana_ms"] > args.limite_ms:
+            print(f"  acima do limite de {args.limite_ms:.0f}ms")
+            falhou = True
+        if args.detalhe:
+            for ms, nome in mais_lentos(modulo):
+                print(f"  {ms:8.1f}ms {nome}")
+    sys.exit(1 if falhou else 0)
@@ -1,45 +1,4 @@
--- Drop das tabelas caso existam, na ordem correta
-DROP TABLE IF EXISTS pedidos CASCADE;
-DROP TABLE IF EXISTS vendas CASCADE;
-DROP TABLE IF EXISTS produtos CASCADE;
-DROP TABLE IF EXISTS fornecedores CASCADE;
-
--- Criação da tabela fornecedores
-CREATE TABLE fornecedores (
-    id SERIAL PRIMARY KEY,
-    nome VARCHAR(100) NOT NULL,
-    cnpj VARCHAR(20) NOT NULL UNIQUE,
-    email VARCHAR(100),
-    telefone VARCHAR(20),
-    segmento VARCHAR(100)
-);
-
--- Criação da tabela produtos
-CREATE TABLE produtos (
-    id SERIAL PRIMARY KEY,
-    nome VARCHAR(100) NOT NULL,
-    estoque_atual INT NOT NULL DEFAULT 0,
-    preco NUMERIC(10, 2) NOT NULL,
-    fornecedor_id INT REFERENCES fornecedores(id)
-);
-
--- Criação da tabela pedidos (com fornecedor_id NOT NULL)
-CREATE TABLE pedidos (
-    id SERIAL PRIMARY KEY,
-    produto_id INT REFERENCES produtos(id) ON DELETE CASCADE,
-    fornecedor_id INT REFERENCES fornecedores(id) NOT NULL,
-    quantidade INT NOT NULL,
-    status VARCHAR(20) NOT NULL DEFAULT 'pendente',
-    data_pedido DATE NOT NULL DEFAULT CURRENT_DATE
-);
-
--- Criação da tabela vendas
-CREATE TABLE vendas (
-    id SERIAL PRIMARY KEY,
-    produto_id INT REFERENCES produtos(id) ON DELETE CASCADE,
-    quantidade INT NOT NULL,
-    data_venda DATE NOT NULL DEFAULT CURRENT_DATE
-);
+-- Dados de demonstração; o esquema vem das migrações (python -m utils.migracoes --seed)
 
 -- Inserção de fornecedores de exemplo
 INSERT INTO fornecedores (nome, cnpj, email, telefone, segmento) VALUES
@@ -59,6 +18,10 @@ INSERT INTO produtos (nome, estoque_atual, preco, fornecedor_id) VALUES
 ('Caixa dÁgua 1000L', 8, 499.00, 2),
 ('Porta de Madeira', 15, 299.90, 1);
 
+-- saldo de abertura no livro de movimentos, como services.criar_produto faz (soma dos movimentos = estoque_atual)
+INSERT INTO movimentos_estoque (produto_id, quantidade, tipo, estoque_resultante)
+SELECT id, estoque_atual, 'saldo_inicial', estoque_atual FROM produtos WHERE estoque_atual <> 0;
+
 -- Vendas simuladas nos últimos 30 dias
 DO $$
 DECLARE
@@ -86,10 +49,3 @@ INSERT INTO pedidos (produto_id, fornecedor_id, quantidade, status, data_pedido)
 (3, 1, 3, 'pendente', CURRENT_DATE - 1),
 (4, 2, 2, 'cancelado', CURRENT_DATE - 10),
 (7, 1, 4, 'pendente', CURRENT_DATE);
-
-
-CREATE TABLE usuarios (
-    username TEXT PRIMARY KEY,
-    name TEXT NOT NULL,
-    password TEXT NOT NULL  
-);
@@ -6,15 +6,14 @@ from utils.services import *
 from utils.utils import *
 from utils.view import *
 from utils.styles import styles
+from utils.assets import url_fundo
+from utils.perfil import perfilar_pagina, painel_perfil
 
 st.set_page_config(page_title="Sistema de Monitoramento de Estoques", layout="wide")
 
-Base.metadata.create_all(bind=engine)
-
 def main():
     st.markdown("<style>header {visibility: hidden;}</style>", unsafe_allow_html=True)
-    img_base64 = get_base64_image("/app/.streamlit/fundo 1.jpeg")
-    st.markdown(styles(img_base64), unsafe_allow_html=True)
+    st.markdown(styles(url_fundo()), unsafe_allow_html=True)
 
     if "usuario" not in st.session_state:
         st.session_state.usuario = None
@@ -32,6 +31,7 @@ def main():
             "Home", "Dashboard", "Pedidos", "Criar Pedido", 
             "Criar Fornecedor", "Fornecedores", "Criar Produtos", "Produtos"
         ])
+        mostrar_perfil = st.sidebar.checkbox("Painel de desempenho", key="mostrar_perfil")
 
         opcoes = {
             "Home": home,
@@ -45,7 +45,10 @@ def main():
         }
 
         if menu in opcoes:
-            opcoes[menu]()
+            with perfilar_pagina(menu) as perfil:
+                opcoes[menu]()
+            if mostrar_perfil:
+                painel_perfil(perfil)
         else:
             st.warning("Opção inválida.")
 
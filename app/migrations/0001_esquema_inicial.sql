@@ -0,0 +1,39 @@
+-- Esquema base; IF NOT EXISTS para adotar bancos criados pelo antigo init_db.sql
+CREATE TABLE IF NOT EXISTS fornecedores (
+    id SERIAL PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    cnpj VARCHAR(20) NOT NULL UNIQUE,
+    email VARCHAR(100),
+    telefone VARCHAR(20),
+    segmento VARCHAR(100)
+);
+
+CREATE TABLE IF NOT EXISTS produtos (
+    id SERIAL PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    estoque_atual INT NOT NULL DEFAULT 0,
+    preco NUMERIC(10, 2) NOT NULL,
+    fornecedor_id INT REFERENCES fornecedores(id)
+);
+
+CREATE TABLE IF NOT EXISTS pedidos (
+    id SERIAL PRIMARY KEY,
+    produto_id INT REFERENCES produtos(id) ON DELETE CASCADE,
+    fornecedor_id INT REFERENCES fornecedores(id) NOT NULL,
+    quantidade INT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pendente',
+    data_pedido DATE NOT NULL DEFAULT CURRENT_DATE
+);
+
+CREATE TABLE IF NOT EXISTS vendas (
+    id SERIAL PRIMARY KEY,
+    produto_id INT REFERENCES produtos(id) ON DELETE CASCADE,
+    quantidade INT NOT NULL,
+    data_venda DATE NOT NULL DEFAULT CURRENT_DATE
+);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    username TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    password TEXT NOT NULL
+);
@@ -0,0 +1,63 @@
+-- Rollup diário de vendas por produto, mantido por triggers de instrução em vendas
+CREATE TABLE IF NOT EXISTS vendas_diarias (
+    produto_id INT NOT NULL REFERENCES produtos(id) ON DELETE CASCADE,
+    dia DATE NOT NULL,
+    quantidade BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (produto_id, dia)
+);
+
+CREATE INDEX IF NOT EXISTS ix_vendas_diarias_dia ON vendas_diarias (dia);
+
+-- conteúdo inicial a partir de vendas (banco adotado pela 0001 já tem histórico; 0004 e 0007 contam com ele).
+-- Recalcula do zero, como sql/vendas_diarias_backfill.sql: um rollup da instalação antiga não é somado de novo
+LOCK TABLE vendas IN SHARE MODE;
+DELETE FROM vendas_diarias;
+INSERT INTO vendas_diarias (produto_id, dia, quantidade)
+SELECT v.produto_id, v.data_venda, SUM(v.quantidade)
+FROM vendas v
+JOIN produtos p ON p.id = v.produto_id
+GROUP BY v.produto_id, v.data_venda;
+
+-- Usa tabelas de transição: um INSERT/COPY de milhares de linhas vira um único upsert agrupado.
+-- O join com produtos descarta linhas removidas em cascata junto com o produto.
+CREATE OR REPLACE FUNCTION vendas_diarias_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        INSERT INTO vendas_diarias (produto_id, dia, quantidade)
+        SELECT o.produto_id, o.data_venda, -SUM(o.quantidade)
+        FROM linhas_antigas o
+        JOIN produtos p ON p.id = o.produto_id
+        GROUP BY o.produto_id, o.data_venda
+        ON CONFLICT (produto_id, dia)
+        DO UPDATE SET quantidade = vendas_diarias.quantidade + EXCLUDED.quantidade;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO vendas_diarias (produto_id, dia, quantidade)
+        SELECT n.produto_id, n.data_venda, SUM(n.quantidade)
+        FROM linhas_novas n
+        JOIN produtos p ON p.id = n.produto_id
+        GROUP BY n.produto_id, n.data_venda
+        ON CONFLICT (produto_id, dia)
+        DO UPDATE SET quantidade = vendas_diarias.quantidade + EXCLUDED.quantidade;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS vendas_diarias_insert ON vendas;
+DROP TRIGGER IF EXISTS vendas_diarias_update ON vendas;
+DROP TRIGGER IF EXISTS vendas_diarias_delete ON vendas;
+
+CREATE TRIGGER vendas_diarias_insert AFTER INSERT ON vendas
+    REFERENCING NEW TABLE AS linhas_novas
+    FOR EACH STATEMENT EXECUTE FUNCTION vendas_diarias_sync();
+
+CREATE TRIGGER vendas_diarias_update AFTER UPDATE ON vendas
+    REFERENCING OLD TABLE AS linhas_antigas NEW TABLE AS linhas_novas
+    FOR EACH STATEMENT EXECUTE FUNCTION vendas_diarias_sync();
+
+CREATE TRIGGER vendas_diarias_delete AFTER DELETE ON vendas
+    REFERENCING OLD TABLE AS linhas_antigas
+    FOR EACH STATEMENT EXECUTE FUNCTION vendas_diarias_sync();
@@ -0,0 +1,10 @@
+-- sem-transacao
+-- Índices dos predicados quentes do dashboard e das listagens.
+-- CONCURRENTLY não bloqueia escritas; cada comando roda isolado, fora de transação.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vendas_produto_data ON vendas (produto_id, data_venda);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vendas_data ON vendas (data_venda);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_pedidos_status ON pedidos (status);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_pedidos_produto ON pedidos (produto_id);
+-- text_pattern_ops atende tanto igualdade quanto o filtro por prefixo (LIKE 'abc%') das listagens
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_produtos_nome ON produtos (nome text_pattern_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_fornecedores_nome ON fornecedores (nome text_pattern_ops);
@@ -0,0 +1,66 @@
+-- vendas passa a ser particionada por mês (RANGE em data_venda).
+-- O modelo Venda não muda: o ORM continua tratando id como identidade, mesmo com a PK (id, data_venda).
+
+-- cria (se faltarem) as partições mensais que cobrem [inicio, fim]
+CREATE OR REPLACE FUNCTION vendas_garantir_particoes(inicio DATE, fim DATE) RETURNS INT AS $$
+DECLARE
+    mes DATE := date_trunc('month', inicio)::date;
+    nome TEXT;
+    criadas INT := 0;
+BEGIN
+    WHILE mes <= fim LOOP
+        nome := 'vendas_' || to_char(mes, 'YYYY_MM');
+        IF to_regclass(nome) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF vendas FOR VALUES FROM (%L) TO (%L)',
+                nome, mes, (mes + INTERVAL '1 month')::date
+            );
+            criadas := criadas + 1;
+        END IF;
+        mes := (mes + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN criadas;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE vendas RENAME TO vendas_legado;
+
+CREATE TABLE vendas (
+    id INT NOT NULL DEFAULT nextval('vendas_id_seq'),
+    produto_id INT REFERENCES produtos(id) ON DELETE CASCADE,
+    quantidade INT NOT NULL,
+    data_venda DATE NOT NULL DEFAULT CURRENT_DATE
+) PARTITION BY RANGE (data_venda);
+
+-- a sequência passa a pertencer à nova tabela antes de o legado ser removido
+ALTER SEQUENCE vendas_id_seq OWNED BY vendas.id;
+
+-- recebe datas fora das partições mensais; a manutenção cria as partições com antecedência
+CREATE TABLE vendas_padrao PARTITION OF vendas DEFAULT;
+
+SELECT vendas_garantir_particoes(
+    COALESCE((SELECT MIN(data_venda) FROM vendas_legado), CURRENT_DATE),
+    (CURRENT_DATE + INTERVAL '3 months')::date
+);
+
+-- sem triggers ainda: o rollup vendas_diarias já contém estas linhas
+INSERT INTO vendas (id, produto_id, quantidade, data_venda)
+SELECT id, produto_id, quantidade, data_venda FROM vendas_legado;
+
+DROP TABLE vendas_legado;
+
+ALTER TABLE vendas ADD CONSTRAINT vendas_pkey PRIMARY KEY (id, data_venda);
+CREATE INDEX ix_vendas_produto_data ON vendas (produto_id, data_venda);
+CREATE INDEX ix_vendas_data ON vendas (data_venda);
+
+CREATE TRIGGER vendas_diarias_insert AFTER INSERT ON vendas
+    REFERENCING NEW TABLE AS linhas_novas
+    FOR EACH STATEMENT EXECUTE FUNCTION vendas_diarias_sync();
+
+CREATE TRIGGER vendas_diarias_update AFTER UPDATE ON vendas
+    REFERENCING OLD TABLE AS linhas_antigas NEW TABLE AS linhas_novas
+    FOR EACH STATEMENT EXECUTE FUNCTION vendas_diarias_sync();
+
+CREATE TRIGGER vendas_diarias_delete AFTER DELETE ON vendas
+    REFERENCING OLD TABLE AS linhas_antigas
+    FOR EACH STATEMENT EXECUTE FUNCTION vendas_diarias_sync();
@@ -0,0 +1,2 @@
+-- Prazo de entrega por fornecedor, usado no planejamento de reposição
+ALTER TABLE fornecedores ADD COLUMN IF NOT EXISTS prazo_entrega_dias INT NOT NULL DEFAULT 7;
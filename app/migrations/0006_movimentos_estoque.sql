@@ -0,0 +1,19 @@
+-- Livro de movimentos de estoque: só recebe INSERTs; produtos.estoque_atual é o saldo corrente.
+-- quantidade é o delta aplicado (negativo para saídas) e estoque_resultante o saldo logo após o movimento.
+CREATE TABLE IF NOT EXISTS movimentos_estoque (
+    id BIGSERIAL PRIMARY KEY,
+    produto_id INT NOT NULL REFERENCES produtos(id) ON DELETE CASCADE,
+    quantidade INT NOT NULL,
+    tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('saldo_inicial', 'venda', 'recebimento', 'estorno', 'ajuste')),
+    referencia_id INT,
+    estoque_resultante INT NOT NULL,
+    criado_em TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_movimentos_estoque_produto ON movimentos_estoque (produto_id, id);
+
+-- saldo de abertura: a soma dos movimentos de cada produto passa a bater com estoque_atual
+INSERT INTO movimentos_estoque (produto_id, quantidade, tipo, estoque_resultante)
+SELECT id, estoque_atual, 'saldo_inicial', estoque_atual
+FROM produtos
+WHERE estoque_atual <> 0;
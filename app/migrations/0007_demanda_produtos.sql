@@ -0,0 +1,77 @@
+-- Estado de demanda por produto: média e segundo momento exponencialmente ponderados (EWMA) das vendas diárias,
+-- mantidos por trigger de instrução em vendas. Cada INSERT/COPY atualiza uma linha por produto, qualquer que
+-- seja o histórico; a leitura (utils/demanda.py) traz o estado até hoje em forma fechada:
+--   k dias sem venda depois de dia_ref:  media_k = beta^k * media,  segundo_k = beta^k * segundo
+--   variância = segundo - media^2, corrigidas pelo peso 1 - beta^(dias desde `desde`)
+-- Vendas só são inseridas: arquivar partições (DETACH) não mexe no estado, e produtos removidos saem em cascata.
+
+-- fator de decaimento diário: meia-vida de 14 dias. Mudar o valor exige reconstruir o estado
+-- (python -m utils.rollup backfill-demanda)
+CREATE OR REPLACE FUNCTION demanda_beta() RETURNS FLOAT8
+    LANGUAGE sql IMMUTABLE AS $$ SELECT power(0.5::FLOAT8, 1.0::FLOAT8 / 14) $$;
+
+CREATE TABLE IF NOT EXISTS demanda_produtos (
+    produto_id INT PRIMARY KEY REFERENCES produtos(id) ON DELETE CASCADE,
+    dia_ref DATE NOT NULL,              -- dia a que media e segundo_momento se referem
+    desde DATE NOT NULL,                -- primeiro dia com venda (correção de viés do início do histórico)
+    media FLOAT8 NOT NULL,
+    segundo_momento FLOAT8 NOT NULL
+);
+
+-- Roda depois de vendas_diarias_sync (triggers disparam em ordem alfabética): o total do dia em vendas_diarias
+-- já inclui esta instrução e as transações concorrentes já confirmadas, então o total anterior do dia é
+-- total - q e o segundo momento recebe exatamente total^2 - anterior^2.
+-- Venda em dia anterior a dia_ref entra com o peso daquele dia: beta^(dia_ref - dia).
+CREATE OR REPLACE FUNCTION demanda_produtos_sync() RETURNS trigger AS $$
+DECLARE
+    beta FLOAT8 := demanda_beta();
+BEGIN
+    WITH por_dia AS (
+        SELECT n.produto_id, n.data_venda AS dia, SUM(n.quantidade)::FLOAT8 AS q
+        FROM linhas_novas n
+        JOIN produtos p ON p.id = n.produto_id
+        GROUP BY n.produto_id, n.data_venda
+    ), com_total AS (
+        SELECT d.produto_id, d.dia, d.q, vd.quantidade::FLOAT8 AS total,
+               MAX(d.dia) OVER (PARTITION BY d.produto_id) AS ref
+        FROM por_dia d
+        JOIN vendas_diarias vd ON vd.produto_id = d.produto_id AND vd.dia = d.dia
+    ), lote AS (
+        SELECT produto_id, ref, MIN(dia) AS desde,
+               (1 - beta) * SUM(power(beta, ref - dia) * q) AS media,
+               (1 - beta) * SUM(power(beta, ref - dia) * (total * total - (total - q) * (total - q))) AS segundo_momento
+        FROM com_total
+        GROUP BY produto_id, ref
+    )
+    INSERT INTO demanda_produtos AS e (produto_id, dia_ref, desde, media, segundo_momento)
+    SELECT produto_id, ref, desde, media, segundo_momento FROM lote
+    ORDER BY produto_id
+    ON CONFLICT (produto_id) DO UPDATE SET
+        dia_ref = GREATEST(e.dia_ref, EXCLUDED.dia_ref),
+        desde = LEAST(e.desde, EXCLUDED.desde),
+        media = e.media * power(beta, GREATEST(EXCLUDED.dia_ref - e.dia_ref, 0))
+              + EXCLUDED.media * power(beta, GREATEST(e.dia_ref - EXCLUDED.dia_ref, 0)),
+        segundo_momento = e.segundo_momento * power(beta, GREATEST(EXCLUDED.dia_ref - e.dia_ref, 0))
+                        + EXCLUDED.segundo_momento * power(beta, GREATEST(e.dia_ref - EXCLUDED.dia_ref, 0));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS vendas_estado_demanda_insert ON vendas;
+
+CREATE TRIGGER vendas_estado_demanda_insert AFTER INSERT ON vendas
+    REFERENCING NEW TABLE AS linhas_novas
+    FOR EACH STATEMENT EXECUTE FUNCTION demanda_produtos_sync();
+
+-- estado inicial a partir do rollup diário (uma passada no histórico, só nesta migração)
+INSERT INTO demanda_produtos (produto_id, dia_ref, desde, media, segundo_momento)
+SELECT produto_id, ref, MIN(dia),
+       (1 - demanda_beta()) * SUM(power(demanda_beta(), ref - dia) * quantidade),
+       (1 - demanda_beta()) * SUM(power(demanda_beta(), ref - dia) * quantidade::FLOAT8 * quantidade)
+FROM (
+    SELECT produto_id, dia, quantidade, MAX(dia) OVER (PARTITION BY produto_id) AS ref
+    FROM vendas_diarias
+    WHERE quantidade <> 0
+) d
+GROUP BY produto_id, ref
+ON CONFLICT (produto_id) DO NOTHING;
@@ -0,0 +1,36 @@
+-- vendas_garantir_particoes: se a partição padrão já tem linhas do mês (datas fora das partições mensais,
+-- gravadas antes de a manutenção rodar), o CREATE ... PARTITION OF falharia. O mês agora é criado como
+-- tabela avulsa, recebe essas linhas e só então é anexado.
+-- Mover direto entre partições não dispara os triggers de instrução de vendas: o rollup e o estado de
+-- demanda já contam essas linhas.
+CREATE OR REPLACE FUNCTION vendas_garantir_particoes(inicio DATE, fim DATE) RETURNS INT AS $$
+DECLARE
+    mes DATE := date_trunc('month', inicio)::date;
+    proximo DATE;
+    nome TEXT;
+    criadas INT := 0;
+BEGIN
+    WHILE mes <= fim LOOP
+        nome := 'vendas_' || to_char(mes, 'YYYY_MM');
+        proximo := (mes + INTERVAL '1 month')::date;
+        IF to_regclass(nome) IS NULL THEN
+            IF EXISTS (SELECT 1 FROM vendas_padrao WHERE data_venda >= mes AND data_venda < proximo) THEN
+                -- bloqueia novas vendas na padrão até o ATTACH, que exige a padrão sem linhas do mês
+                LOCK TABLE vendas_padrao IN SHARE ROW EXCLUSIVE MODE;
+                EXECUTE format('CREATE TABLE %I (LIKE vendas INCLUDING DEFAULTS)', nome);
+                EXECUTE format(
+                    'WITH movidas AS (DELETE FROM vendas_padrao WHERE data_venda >= %L AND data_venda < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM movidas',
+                    mes, proximo, nome
+                );
+                EXECUTE format('ALTER TABLE vendas ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', nome, mes, proximo);
+            ELSE
+                EXECUTE format('CREATE TABLE %I PARTITION OF vendas FOR VALUES FROM (%L) TO (%L)', nome, mes, proximo);
+            END IF;
+            criadas := criadas + 1;
+        END IF;
+        mes := proximo;
+    END LOOP;
+    RETURN criadas;
+END;
+$$ LANGUAGE plpgsql;
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Numeric, Date, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from utils.db import Base
 from datetime import date
@@ -12,6 +12,7 @@ class Fornecedor(Base):
     email = Column(String, nullable=True)
     telefone = Column(String, nullable=True)
     segmento = Column(String, nullable=True)
+    prazo_entrega_dias = Column(Integer, nullable=False, default=7)
 
     produtos = relationship("Produto", back_populates="fornecedor")
     pedidos = relationship("Pedido", back_populates="fornecedor")  
@@ -53,9 +54,40 @@ class Venda(Base):
 
     produto = relationship("Produto", back_populates="vendas")
 
+class VendaDiaria(Base):
+    # rollup mantido por triggers em vendas (ver migrations/0002_vendas_diarias.sql)
+    __tablename__ = "vendas_diarias"
+
+    produto_id = Column(Integer, ForeignKey("produtos.id", ondelete="CASCADE"), primary_key=True)
+    dia = Column(Date, primary_key=True, index=True)
+    quantidade = Column(BigInteger, nullable=False, default=0)
+
+class DemandaProduto(Base):
+    # estado EWMA da demanda diária, mantido por trigger em vendas (migrations/0007_demanda_produtos.sql);
+    # lido por utils/demanda.py
+    __tablename__ = "demanda_produtos"
+
+    produto_id = Column(Integer, ForeignKey("produtos.id", ondelete="CASCADE"), primary_key=True)
+    dia_ref = Column(Date, nullable=False)
+    desde = Column(Date, nullable=False)
+    media = Column(Float, nullable=False)
+    segundo_momento = Column(Float, nullable=False)
+
 class Usuario(Base):
     __tablename__ = "usuarios"
 
     username = Column(String, primary_key=True)
     name = Column(String, nullable=False)
     password = Column(String, nullable=False)
+
+class MovimentoEstoque(Base):
+    # livro de movimentos (migrations/0006_movimentos_estoque.sql); gravado só por utils/estoque.py
+    __tablename__ = "movimentos_estoque"
+
+    id = Column(BigInteger, primary_key=True)
+    produto_id = Column(Integer, ForeignKey("produtos.id", ondelete="CASCADE"), nullable=False, index=True)
+    quantidade = Column(Integer, nullable=False)
+    tipo = Column(String(20), nullable=False)
+    referencia_id = Column(Integer, nullable=True)
+    estoque_resultante = Column(Integer, nullable=False)
+    criado_em = Column(DateTime(timezone=True), nullable=False)
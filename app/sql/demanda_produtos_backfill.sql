@@ -0,0 +1,15 @@
+-- Reconstrói o estado de demanda (EWMA) a partir do rollup diário; bloqueia escritas em vendas durante a reconstrução
+BEGIN;
+LOCK TABLE vendas IN SHARE MODE;
+DELETE FROM demanda_produtos;
+INSERT INTO demanda_produtos (produto_id, dia_ref, desde, media, segundo_momento)
+SELECT produto_id, ref, MIN(dia),
+       (1 - demanda_beta()) * SUM(power(demanda_beta(), ref - dia) * quantidade),
+       (1 - demanda_beta()) * SUM(power(demanda_beta(), ref - dia) * quantidade::FLOAT8 * quantidade)
+FROM (
+    SELECT produto_id, dia, quantidade, MAX(dia) OVER (PARTITION BY produto_id) AS ref
+    FROM vendas_diarias
+    WHERE quantidade <> 0
+) d
+GROUP BY produto_id, ref;
+COMMIT;
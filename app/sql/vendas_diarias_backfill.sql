@@ -0,0 +1,10 @@
+-- Recalcula o rollup a partir de vendas; bloqueia escritas em vendas durante a reconstrução
+BEGIN;
+LOCK TABLE vendas IN SHARE MODE;
+DELETE FROM vendas_diarias;
+INSERT INTO vendas_diarias (produto_id, dia, quantidade)
+SELECT v.produto_id, v.data_venda, SUM(v.quantidade)
+FROM vendas v
+JOIN produtos p ON p.id = v.produto_id
+GROUP BY v.produto_id, v.data_venda;
+COMMIT;
@@ -0,0 +1,88 @@
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models.models import Fornecedor, Pedido, Produto
+from utils import services
+from utils.db import SessionLocal, contar_consultas
+from utils.demanda import demanda_atual
+from utils.reposicao import planejar_reposicao
+
+# Número de statements das leituras das telas: cada uma deve sair em uma consulta, qualquer que seja o número
+# de pedidos/produtos (sem N+1 nas relações). Roda contra o Postgres de DATABASE_URL, com as migrações aplicadas:
+#   pip install -r requirements-dev.txt && python -m pytest tests
+
+PEDIDOS = 5
+
+
+def _sem_cache(funcao):
+    return getattr(funcao, "sem_cache", funcao)
+
+
+@pytest.fixture(scope="module")
+def db():
+    sessao = SessionLocal()
+    try:
+        sessao.execute(text("SELECT 1"))
+    except OperationalError:
+        pytest.skip("Postgres indisponível (DATABASE_URL)")
+    yield sessao
+    sessao.close()
+
+
+@pytest.fixture(scope="module")
+def dados(db):
+    # pedidos de produtos e fornecedores distintos: um N+1 apareceria como statements extras
+    sufixo = uuid.uuid4().hex[:8]
+    fornecedores = [Fornecedor(nome=f"Fornecedor Teste {sufixo} {i}", cnpj=f"t{sufixo}{i:02d}") for i in range(PEDIDOS)]
+    db.add_all(fornecedores)
+    db.flush()
+    produtos = [Produto(nome=f"Produto Teste {sufixo} {i}", estoque_atual=0, preco=1, fornecedor_id=f.id)
+                for i, f in enumerate(fornecedores)]
+    db.add_all(produtos)
+    db.flush()
+    db.add_all([Pedido(produto_id=p.id, fornecedor_id=p.fornecedor_id, quantidade=1) for p in produtos])
+    db.commit()
+    produto_ids, fornecedor_ids = [p.id for p in produtos], [f.id for f in fornecedores]
+    yield {"produtos": produto_ids, "fornecedores": fornecedor_ids}
+    services.deletar_produto(db, produto_ids)
+    services.deletar_fornecedor(db, fornecedor_ids)
+
+
+def _consultas(funcao) -> list:
+    with contar_consultas() as consultas:
+        funcao()
+    return consultas
+
+
+def test_listar_pedidos_uma_consulta(db, dados):
+    resultado = []
+    consultas = _consultas(lambda: resultado.extend(_sem_cache(services.listar_pedidos)(db)[0]))
+    assert len(consultas) == 1
+    # os nomes vêm na mesma linha: ler produto e fornecedor não dispara nada
+    with contar_consultas() as consultas:
+        nomes = [(p.produto, p.fornecedor) for p in resultado]
+    assert len(consultas) == 0 and nomes
+
+
+def test_get_pedidos_relacoes_carregadas_juntas(db, dados):
+    pedidos = []
+    consultas = _consultas(lambda: pedidos.extend(_sem_cache(services.get_pedidos)(db)))
+    assert len(consultas) == 1
+    with contar_consultas() as consultas:
+        [(p.produto.nome, p.fornecedor.nome) for p in pedidos if p.produto_id in dados["produtos"]]
+    assert len(consultas) == 0
+
+
+@pytest.mark.parametrize("leitura", [
+    lambda db: _sem_cache(services.contar_pedidos_por_status)(db),
+    lambda db: _sem_cache(services.listar_produtos)(db, prefixo_nome="Produto Teste"),
+    lambda db: _sem_cache(services.listar_fornecedores)(db, prefixo_nome="Fornecedor Teste"),
+    lambda db: _sem_cache(demanda_atual)(db),
+    lambda db: _sem_cache(planejar_reposicao)(db),
+], ids=["contar_pedidos_por_status", "listar_produtos", "listar_fornecedores", "demanda_atual",
+        "planejar_reposicao"])
+def test_leituras_das_telas_uma_consulta(db, dados, leitura):
+    assert len(_consultas(lambda: leitura(db))) == 1
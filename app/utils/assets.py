@@ -0,0 +1,71 @@
+import base64
+import hashlib
+import io
+import os
+from functools import lru_cache
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+FUNDO_ORIGEM = APP_DIR / ".streamlit" / "fundo 1.jpeg"
+# pasta servida pelo Streamlit em app/static/ quando server.enableStaticServing = true
+STATIC_DIR = APP_DIR / "static"
+FUNDO_LARGURA_MAX = int(os.getenv("FUNDO_LARGURA_MAX", "1920"))
+FUNDO_QUALIDADE = int(os.getenv("FUNDO_QUALIDADE", "75"))
+
+
+def otimizar_imagem(dados: bytes, largura_max: int = FUNDO_LARGURA_MAX, qualidade: int = FUNDO_QUALIDADE):
+    # reduz para no máximo `largura_max` px e recomprime em WebP (ou JPEG progressivo se o Pillow não tiver WebP);
+    # sem Pillow devolve a imagem original
+    try:
+        from PIL import Image, features
+    except ImportError:
+        return dados, "jpeg"
+
+    imagem = Image.open(io.BytesIO(dados))
+    imagem.thumbnail((largura_max, largura_max * 4))
+    saida = io.BytesIO()
+    if features.check("webp"):
+        imagem.save(saida, "WEBP", quality=qualidade, method=6)
+        formato = "webp"
+    else:
+        imagem.convert("RGB").save(saida, "JPEG", quality=qualidade, optimize=True, progressive=True)
+        formato = "jpeg"
+    # a recompressão não pode piorar uma imagem que já era pequena
+    return (saida.getvalue(), formato) if saida.tell() < len(dados) else (dados, "jpeg")
+
+
+def publicar_fundo(origem: Path = FUNDO_ORIGEM, destino: Path = STATIC_DIR) -> Path:
+    # grava a versão otimizada com o hash do conteúdo no nome: trocar a imagem muda a URL,
+    # então o navegador pode manter a antiga em cache sem risco de ficar desatualizado
+    dados, formato = otimizar_imagem(origem.read_bytes())
+    arquivo = destino / f"fundo-{hashlib.sha1(dados).hexdigest()[:12]}.{formato}"
+    if not arquivo.exists():
+        destino.mkdir(parents=True, exist_ok=True)
+        temporario = arquivo.with_suffix(".tmp")
+        temporario.write_bytes(dados)
+        temporario.replace(arquivo)
+    return arquivo
+
+
+@lru_cache(maxsize=None)
+def url_fundo() -> str:
+    # calculada uma vez por processo. Com o static serving ligado o CSS leva só a URL;
+    # sem ele, cai no data URI da versão já otimizada
+    import streamlit as st
+
+    try:
+        arquivo = publicar_fundo()
+        if st.get_option("server.enableStaticServing"):
+            return f"app/static/{arquivo.name}"
+        dados = arquivo.read_bytes()
+        formato = arquivo.suffix.lstrip(".")
+    except OSError:
+        # pasta somente leitura: otimiza em memória
+        dados, formato = otimizar_imagem(FUNDO_ORIGEM.read_bytes())
+    return f"data:image/{formato};base64,{base64.b64encode(dados).decode()}"
+
+
+if __name__ == "__main__":
+    # usado no build da imagem para já publicar o fundo otimizado
+    arquivo = publicar_fundo()
+    print(f"{arquivo.name}: {FUNDO_ORIGEM.stat().st_size // 1024} KB -> {arquivo.stat().st_size // 1024} KB")
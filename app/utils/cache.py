@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+from sqlalchemy import inspect
+
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+CACHE_TTL_VENDAS = float(os.getenv("CACHE_TTL_VENDAS", "60"))
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "256"))
+# por quanto tempo depois de uma escrita a réplica de leitura pode ainda não tê-la aplicado
+ATRASO_REPLICA_S = float(os.getenv("ATRASO_REPLICA_S", "10"))
+
+_lock = threading.RLock()
+_versoes = defaultdict(int)
+_alteradas_em = {}  # tabela -> time.monotonic() da última invalidação
+_entradas = OrderedDict()  # chave -> (expira_em, versões das tabelas, valor)
+_estatisticas = {"hits": 0, "misses": 0, "expiradas": 0, "invalidadas": 0, "despejadas": 0}
+
+
+def invalidar(*tabelas: str):
+    # chamado pelas funções de escrita; leituras que dependem dessas tabelas deixam de valer
+    agora = time.monotonic()
+    with _lock:
+        for tabela in tabelas:
+            _versoes[tabela] += 1
+            _alteradas_em[tabela] = agora
+
+
+def versao(*tabelas: str) -> tuple:
+    with _lock:
+        return tuple(_versoes[t] for t in tabelas)
+
+
+def recem_alteradas(*tabelas: str) -> bool:
+    # alguma das tabelas foi escrita há menos de ATRASO_REPLICA_S (a réplica pode estar atrasada)
+    limite = time.monotonic() - ATRASO_REPLICA_S
+    with _lock:
+        return any(_alteradas_em.get(t, float("-inf")) > limite for t in tabelas)
+
+
+def _congelar(valor):
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return tuple(_congelar(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    return valor
+
+
+def _desanexar(db, valor):
+    # objetos ORM em cache não podem ficar presos à sessão que os carregou:
+    # um commit posterior os expiraria e o próximo rerun receberia instâncias inutilizáveis
+    pendentes = [valor]
+    while pendentes:
+        item = pendentes.pop()
+        if isinstance(item, (list, tuple)):
+            pendentes.extend(item)
+            continue
+        if not hasattr(item, "_sa_instance_state") or item not in db:
+            continue
+        db.expunge(item)
+        for relacao in inspect(item).mapper.relationships:
+            carregado = item.__dict__.get(relacao.key)
+            if isinstance(carregado, list):
+                pendentes.extend(carregado)
+            elif carregado is not None:
+                pendentes.append(carregado)
+
+
+def cache_leitura(*tabelas: str, ttl: float | None = None):
+    # cacheia f(db, *args) até que alguma das tabelas seja alterada ou o TTL expire
+    def decorador(func):
+        @wraps(func)
+        def wrapper(db, *args, **kwargs):
+            chave = (func.__module__, func.__qualname__, _congelar(args), _congelar(kwargs))
+            versoes_atuais = versao(*tabelas)
+            agora = time.monotonic()
+
+            with _lock:
+                entrada = _entradas.get(chave)
+                if entrada is not None:
+                    expira_em, versoes, valor = entrada
+                    if versoes == versoes_atuais and agora < expira_em:
+                        _entradas.move_to_end(chave)
+                        _estatisticas["hits"] += 1
+                        return valor
+                    _estatisticas["invalidadas" if versoes != versoes_atuais else "expiradas"] += 1
+                    del _entradas[chave]
+                _estatisticas["misses"] += 1
+
+            # logo depois de uma escrita a leitura vai ao primário: vinda de uma réplica atrasada, a versão
+            # antiga ficaria no cache até o TTL mesmo já invalidada
+            ler_no_primario = getattr(db, "ler_no_primario", None)
+            if ler_no_primario is not None and recem_alteradas(*tabelas):
+                with ler_no_primario():
+                    valor = func(db, *args, **kwargs)
+            else:
+                valor = func(db, *args, **kwargs)
+            _desanexar(db, valor)
+
+            with _lock:
+                _entradas[chave] = (agora + (CACHE_TTL if ttl is None else ttl), versoes_atuais, valor)
+                _entradas.move_to_end(chave)
+                while len(_entradas) > CACHE_MAX_ENTRADAS:
+                    _entradas.popitem(last=False)
+                    _estatisticas["despejadas"] += 1
+            return valor
+
+        wrapper.sem_cache = func
+        return wrapper
+    return decorador
+
+
+def estatisticas_cache() -> dict:
+    with _lock:
+        total = _estatisticas["hits"] + _estatisticas["misses"]
+        return {
+            **_estatisticas,
+            "entradas": len(_entradas),
+            "taxa_acerto": _estatisticas["hits"] / total if total else 0.0,
+            "versoes": dict(_versoes),
+        }
+
+
+def limpar_cache():
+    with _lock:
+        _entradas.clear()
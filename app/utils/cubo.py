@@ -0,0 +1,82 @@
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models.models import Produto, VendaDiaria
+from utils.cache import cache_leitura, CACHE_TTL_VENDAS
+
+
+@dataclass
+class CuboVendas:
+    # matriz densa produtos x dias com as quantidades vendidas
+    matriz: np.ndarray
+    produto_ids: np.ndarray
+    nomes: list
+    estoques: np.ndarray
+    precos: np.ndarray
+    datas: list
+    indice_produto: dict = field(default_factory=dict)
+    indice_data: dict = field(default_factory=dict)
+
+    @property
+    def dias(self) -> int:
+        return len(self.datas)
+
+    def serie_produto(self, produto_id: int) -> np.ndarray:
+        return self.matriz[self.indice_produto[produto_id]]
+
+    def totais_diarios(self) -> np.ndarray:
+        return self.matriz.sum(axis=0)
+
+    def totais_produto(self) -> np.ndarray:
+        return self.matriz.sum(axis=1)
+
+    def media_diaria(self) -> np.ndarray:
+        return self.totais_produto() / max(self.dias, 1)
+
+    def top_n(self, n: int = 5) -> np.ndarray:
+        # índices das linhas dos n produtos mais vendidos, ignorando quem não vendeu
+        totais = self.totais_produto()
+        ordem = np.argsort(-totais, kind="stable")[:n]
+        return ordem[totais[ordem] > 0]
+
+    def giro_estoque(self) -> np.ndarray:
+        return self.media_diaria() / np.where(self.estoques == 0, 1, self.estoques)
+
+
+@cache_leitura("vendas", "produtos", ttl=CACHE_TTL_VENDAS)
+def carregar_cubo_vendas(db: Session, dias: int = 30, data_fim: date | None = None) -> CuboVendas:
+    data_fim = data_fim or date.today()
+    data_inicio = data_fim - timedelta(days=dias - 1)
+
+    produtos = db.query(Produto.id, Produto.nome, Produto.estoque_atual, Produto.preco).order_by(Produto.id).all()
+    vendas = db.query(VendaDiaria.produto_id, VendaDiaria.dia, VendaDiaria.quantidade).filter(
+        VendaDiaria.dia.between(data_inicio, data_fim)
+    ).all()
+
+    produto_ids = np.array([p.id for p in produtos], dtype=np.int64)
+    datas = [data_inicio + timedelta(days=i) for i in range(dias)]
+    indice_produto = {int(pid): i for i, pid in enumerate(produto_ids)}
+    indice_data = {d: i for i, d in enumerate(datas)}
+
+    matriz = np.zeros((len(produtos), len(datas)), dtype=np.float64)
+    if vendas:
+        linhas = np.fromiter((indice_produto.get(v[0], -1) for v in vendas), dtype=np.int64, count=len(vendas))
+        colunas = np.fromiter((indice_data[v[1]] for v in vendas), dtype=np.int64, count=len(vendas))
+        quantidades = np.fromiter((v[2] or 0 for v in vendas), dtype=np.float64, count=len(vendas))
+        validas = linhas >= 0
+        np.add.at(matriz, (linhas[validas], colunas[validas]), quantidades[validas])
+
+    nomes = [p.nome for p in produtos]
+    return CuboVendas(
+        matriz=matriz,
+        produto_ids=produto_ids,
+        nomes=nomes,
+        estoques=np.array([p.estoque_atual or 0 for p in produtos], dtype=np.float64),
+        precos=np.array([float(p.preco) for p in produtos], dtype=np.float64),
+        datas=datas,
+        indice_produto=indice_produto,
+        indice_data=indice_data,
+    )
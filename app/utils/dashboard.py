@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoExpirado
+
+from sqlalchemy import event
+
+from utils.db import SessionLeitura, perfil_ativo, perfilar_consultas
+
+DASHBOARD_WORKERS = int(os.getenv("DASHBOARD_WORKERS", "6"))
+DASHBOARD_TIMEOUT_S = float(os.getenv("DASHBOARD_TIMEOUT_S", "20"))
+# espera máxima na fila do executor: uma tarefa presa (a prévia DuckDB não tem statement_timeout) não trava a página
+DASHBOARD_FILA_S = float(os.getenv("DASHBOARD_FILA_S", "10"))
+
+# um executor para o processo inteiro: limita as conexões que o dashboard ocupa ao mesmo tempo,
+# qualquer que seja o número de usuários na página
+_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
+
+def _executar(tarefa, timeout_s: float, consultas, inicio: dict):
+    # cada consulta tem sua própria sessão (e conexão do pool); o statement_timeout cancela
+    # no servidor o que passar do limite, em vez de deixar a consulta rodando sem ninguém esperar
+    inicio["em"] = time.monotonic()
+    inicio["evento"].set()
+    with perfilar_consultas(consultas), SessionLeitura() as db:
+        @event.listens_for(db, "after_begin")
+        def _limitar(session, transaction, conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(1000 * timeout_s)}")
+
+        return tarefa(db)
+
+
+def carregar_em_paralelo(tarefas: dict, timeout_s: float = DASHBOARD_TIMEOUT_S):
+    # dispara todas as tarefas (nome -> função(db)) de uma vez e espera no máximo timeout_s por cada uma,
+    # contados de quando a tarefa começa a rodar: com o executor cheio (outros usuários na página) o tempo
+    # na fila não consome o prazo, que tem limite próprio (DASHBOARD_FILA_S).
+    # O tempo total fica perto da consulta mais lenta em vez da soma de todas.
+    # Retorna (resultados, erros): tarefas que falharam, expiraram ou não saíram da fila ficam só em erros.
+    consultas = perfil_ativo()
+    inicios = {nome: {"evento": threading.Event()} for nome in tarefas}
+    futuros = {nome: _executor.submit(_executar, tarefa, timeout_s, consultas, inicios[nome])
+               for nome, tarefa in tarefas.items()}
+    limite_fila = time.monotonic() + DASHBOARD_FILA_S
+    resultados, erros = {}, {}
+    for nome, futuro in futuros.items():
+        if not inicios[nome]["evento"].wait(max(limite_fila - time.monotonic(), 0)) and futuro.cancel():
+            erros[nome] = f"executor ocupado: a consulta não começou em {DASHBOARD_FILA_S:.0f}s"
+            continue
+        inicios[nome]["evento"].wait()  # cancel() falhou: a tarefa acabou de começar
+        try:
+            resultados[nome] = futuro.result(timeout=max(inicios[nome]["em"] + timeout_s - time.monotonic(), 0))
+        except FuturoExpirado:
+            erros[nome] = f"tempo esgotado ({timeout_s:.0f}s)"
+        except Exception as e:
+            erros[nome] = str(e)
+    return resultados, erros
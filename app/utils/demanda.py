@@ -0,0 +1,32 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.models import DemandaProduto
+from utils.cache import cache_leitura, CACHE_TTL_VENDAS
+
+# Demanda diária por produto lida do estado EWMA (migrations/0007_demanda_produtos.sql): uma linha por produto,
+# custo constante qualquer que seja o histórico. Produto sem venda registrada não tem estado (demanda zero).
+
+
+def colunas_demanda():
+    # (média, desvio) diários trazidos até hoje: os dias sem venda desde dia_ref só decaem (beta^k), e a
+    # divisão pelo peso acumulado corrige o viés dos primeiros dias de histórico
+    beta = func.demanda_beta()
+    decaimento = func.power(beta, func.greatest(func.current_date() - DemandaProduto.dia_ref, 0))
+    peso = 1 - func.power(beta, func.greatest(func.current_date() - DemandaProduto.desde + 1, 1))
+    media = DemandaProduto.media * decaimento / peso
+    segundo_momento = DemandaProduto.segundo_momento * decaimento / peso
+    return media, func.sqrt(func.greatest(segundo_momento - media * media, 0))
+
+
+@cache_leitura("vendas", "produtos", ttl=CACHE_TTL_VENDAS)
+def demanda_atual(db: Session, produto_ids=None) -> dict:
+    # {produto_id: {"media_diaria", "desvio_diario"}}, pela chave primária quando produto_ids é informado
+    media, desvio = colunas_demanda()
+    stmt = select(DemandaProduto.produto_id, media, desvio)
+    if produto_ids is not None:
+        stmt = stmt.where(DemandaProduto.produto_id.in_(list(produto_ids)))
+    return {
+        produto_id: {"media_diaria": float(m), "desvio_diario": float(d)}
+        for produto_id, m, d in db.execute(stmt).all()
+    }
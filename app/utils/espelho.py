@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import shutil
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from utils.db import read_engine
+
+# Espelho analítico: cópia colunar (Parquet) do banco para relatórios de período longo, consultada por um
+# DuckDB embutido em vez do Postgres que atende as escritas.
+#   vendas                         -> incremental por id (marca d'água), particionado por mês (mes=AAAA-MM)
+#   produtos, fornecedores, pedidos -> snapshot completo a cada atualização (são alterados no lugar)
+# Vendas só são inseridas; o que as partições arquivadas removem do banco continua no espelho.
+# O id vem da sequência antes do commit: uma importação longa pode confirmar ids abaixo da marca depois que ids
+# maiores já foram exportados. Por isso cada execução relê ESPELHO_JANELA_IDS ids abaixo da marca e grava só os
+# que ainda não estão no espelho.
+
+ESPELHO_DIR = Path(os.getenv("ESPELHO_DIR", "/app/espelho"))
+LINHAS_POR_LOTE = 100_000
+JANELA_IDS = int(os.getenv("ESPELHO_JANELA_IDS", "1000000"))
+ARQUIVO_MARCAS = "marcas.json"
+
+COLUNAS_VENDAS = [("id", "int64"), ("produto_id", "int64"), ("quantidade", "int64"), ("data_venda", "date32")]
+SNAPSHOTS = {
+    "produtos": ("SELECT id, nome, estoque_atual, preco::float8, fornecedor_id FROM produtos ORDER BY id",
+                 [("id", "int64"), ("nome", "string"), ("estoque_atual", "int64"), ("preco", "float64"),
+                  ("fornecedor_id", "int64")]),
+    "fornecedores": ("SELECT id, nome, segmento, prazo_entrega_dias FROM fornecedores ORDER BY id",
+                     [("id", "int64"), ("nome", "string"), ("segmento", "string"), ("prazo_entrega_dias", "int64")]),
+    "pedidos": ("SELECT id, produto_id, fornecedor_id, quantidade, status, data_pedido FROM pedidos ORDER BY id",
+                [("id", "int64"), ("produto_id", "int64"), ("fornecedor_id", "int64"), ("quantidade", "int64"),
+                 ("status", "string"), ("data_pedido", "date32")]),
+}
+
+
+def _schema(colunas: list):
+    import pyarrow as pa
+    return pa.schema([(nome, pa.type_for_alias(tipo)) for nome, tipo in colunas])
+
+
+def _tabela(linhas: list, schema):
+    import pyarrow as pa
+    return pa.Table.from_arrays(
+        [pa.array(coluna, type=campo.type) for campo, coluna in zip(schema, zip(*linhas))], schema=schema
+    )
+
+
+def _lotes(sql: str, parametros: dict | None = None):
+    # cursor do lado do servidor: memória limitada a um lote, qualquer que seja a tabela
+    with read_engine.connect() as conn:
+        resultado = conn.execution_options(stream_results=True, max_row_buffer=LINHAS_POR_LOTE) \
+            .exec_driver_sql(sql, parametros or {})
+        yield from resultado.partitions(LINHAS_POR_LOTE)
+
+
+def ler_marcas(destino: Path = ESPELHO_DIR) -> dict:
+    arquivo = destino / ARQUIVO_MARCAS
+    return json.loads(arquivo.read_text(encoding="utf-8")) if arquivo.exists() else {}
+
+
+def _gravar_marcas(destino: Path, marcas: dict):
+    temporario = destino / f"{ARQUIVO_MARCAS}.tmp"
+    temporario.write_text(json.dumps(marcas, indent=2), encoding="utf-8")
+    temporario.replace(destino / ARQUIVO_MARCAS)
+
+
+def _exportar_snapshot(nome: str, sql: str, colunas: list, destino: Path) -> int:
+    import pyarrow.parquet as pq
+
+    schema = _schema(colunas)
+    arquivo = destino / f"{nome}.parquet"
+    temporario = arquivo.with_suffix(".parquet.tmp")
+    total = 0
+    with pq.ParquetWriter(temporario, schema, compression="zstd") as escritor:
+        for lote in _lotes(sql):
+            escritor.write_table(_tabela(lote, schema))
+            total += len(lote)
+    temporario.replace(arquivo)
+    return total
+
+
+def _remover_orfaos(pasta: Path, marca: int, execucao: int):
+    # arquivos de uma execução interrompida antes de gravar as marcas: serão exportados de novo.
+    # parte-<execução>.parquet; desde-<id>.parquet é o nome usado antes da janela de releitura
+    for arquivo in pasta.glob("mes=*/*"):
+        prefixo, numero = arquivo.stem.split(".")[0].split("-")
+        if arquivo.suffix == ".tmp" or int(numero) > (execucao if prefixo == "parte" else marca):
+            arquivo.unlink()
+
+
+def _ids_exportados(pasta: Path, acima_de: int) -> set:
+    # ids já presentes no espelho acima de `acima_de`; as estatísticas dos row groups evitam ler o resto
+    import pyarrow.dataset as ds
+
+    arquivos = [str(arquivo) for arquivo in pasta.glob("mes=*/*.parquet")]
+    if not arquivos:
+        return set()
+    tabela = ds.dataset(arquivos, format="parquet").to_table(columns=["id"], filter=ds.field("id") > acima_de)
+    return set(tabela.column("id").to_pylist())
+
+
+def _exportar_vendas(destino: Path, marca: int, execucao: int):
+    # um arquivo por mês tocado nesta execução: mes=AAAA-MM/parte-<execução>.parquet
+    import pyarrow.parquet as pq
+
+    pasta = destino / "vendas"
+    pasta.mkdir(parents=True, exist_ok=True)
+    _remover_orfaos(pasta, marca, execucao - 1)
+    inicio_janela = max(marca - JANELA_IDS, 0)
+    exportados = _ids_exportados(pasta, inicio_janela)
+    schema = _schema(COLUNAS_VENDAS)
+    escritores, total, nova_marca = {}, 0, marca
+    try:
+        for lote in _lotes("SELECT id, produto_id, quantidade, data_venda FROM vendas WHERE id > %(inicio)s ORDER BY id",
+                           {"inicio": inicio_janela}):
+            nova_marca = max(nova_marca, lote[-1][0])
+            lote = [linha for linha in lote if linha[0] not in exportados]
+            por_mes = defaultdict(list)
+            for linha in lote:
+                por_mes[linha[3].strftime("%Y-%m")].append(linha)
+            for mes, linhas in por_mes.items():
+                if mes not in escritores:
+                    (pasta / f"mes={mes}").mkdir(exist_ok=True)
+                    temporario = pasta / f"mes={mes}" / f"parte-{execucao:06d}.parquet.tmp"
+                    escritores[mes] = (temporario, pq.ParquetWriter(temporario, schema, compression="zstd"))
+                escritores[mes][1].write_table(_tabela(linhas, schema))
+            total += len(lote)
+    finally:
+        for temporario, escritor in escritores.values():
+            escritor.close()
+    for temporario, _ in escritores.values():
+        temporario.replace(temporario.with_suffix(""))
+    return total, nova_marca
+
+
+def atualizar_espelho(destino: Path = ESPELHO_DIR, reconstruir: bool = False) -> dict:
+    if reconstruir and destino.exists():
+        shutil.rmtree(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    marcas = ler_marcas(destino)
+    exportadas = {}
+    execucao = marcas.get("execucao", 0) + 1
+    exportadas["vendas"], marcas["vendas"] = _exportar_vendas(destino, marcas.get("vendas", 0), execucao)
+    marcas["execucao"] = execucao
+    for nome, (sql, colunas) in SNAPSHOTS.items():
+        exportadas[nome] = _exportar_snapshot(nome, sql, colunas, destino)
+    marcas["atualizado_em"] = datetime.now().isoformat(timespec="seconds")
+    _gravar_marcas(destino, marcas)
+    return exportadas
+
+
+def espelho_disponivel(destino: Path = ESPELHO_DIR) -> bool:
+    if not (destino / ARQUIVO_MARCAS).exists():
+        return False
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _literal(caminho: Path) -> str:
+    return "'" + str(caminho).replace("'", "''") + "'"
+
+
+def conectar_duckdb(destino: Path = ESPELHO_DIR):
+    # conexão em memória por chamada (DuckDB não compartilha conexão entre threads); as views têm os nomes
+    # das tabelas do Postgres, então as mesmas consultas SQLAlchemy rodam nos dois motores
+    import duckdb
+
+    conn = duckdb.connect()
+    if any((destino / "vendas").glob("mes=*/*.parquet")):
+        conn.execute(f"CREATE VIEW vendas AS SELECT id, produto_id, quantidade, data_venda FROM read_parquet("
+                     f"{_literal(destino / 'vendas' / 'mes=*' / '*.parquet')}, hive_partitioning = true)")
+    else:
+        conn.execute("CREATE VIEW vendas AS SELECT NULL::BIGINT AS id, NULL::BIGINT AS produto_id, "
+                     "NULL::BIGINT AS quantidade, NULL::DATE AS data_venda WHERE false")
+    for nome in SNAPSHOTS:
+        conn.execute(f"CREATE VIEW {nome} AS SELECT * FROM read_parquet({_literal(destino / f'{nome}.parquet')})")
+    conn.execute("CREATE VIEW vendas_diarias AS SELECT produto_id, data_venda AS dia, SUM(quantidade)::BIGINT AS quantidade "
+                 "FROM vendas GROUP BY produto_id, data_venda")
+    return conn
+
+
+def compilar_duckdb(stmt):
+    # o SQL do dialeto do Postgres com parâmetros posicionais (?) é aceito pelo DuckDB
+    from sqlalchemy.dialects import postgresql
+
+    compilado = stmt.compile(dialect=postgresql.dialect(paramstyle="qmark"))
+    return str(compilado), [compilado.params[nome] for nome in compilado.positiontup]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Espelho analítico em Parquet para o DuckDB")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_atualizar = sub.add_parser("atualizar", help="exporta as vendas novas e os snapshots das demais tabelas")
+    p_atualizar.add_argument("--destino", type=Path, default=ESPELHO_DIR)
+    p_atualizar.add_argument("--reconstruir", action="store_true", help="apaga o espelho e exporta tudo de novo")
+    args = parser.parse_args()
+
+    inicio = datetime.now()
+    exportadas = atualizar_espelho(args.destino, args.reconstruir)
+    print(", ".join(f"{nome}: {total}" for nome, total in exportadas.items()),
+          f"({(datetime.now() - inicio).total_seconds():.1f}s)")
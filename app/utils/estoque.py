@@ -0,0 +1,106 @@
+from collections import defaultdict
+
+from sqlalchemy import select, text
+
+from models.models import Produto
+
+# Toda alteração de estoque passa por aqui: trava as linhas dos produtos em ordem de id (duas transações
+# que movimentam os mesmos SKUs esperam uma pela outra em vez de entrar em deadlock) e aplica os deltas no
+# banco com estoque_atual = estoque_atual + delta, registrando cada um no livro movimentos_estoque.
+# Não faz commit: o movimento entra na transação de quem chama (pedido, importação, ajuste).
+
+TIPOS_MOVIMENTO = ("saldo_inicial", "venda", "recebimento", "estorno", "ajuste")
+
+# um registro no livro por (produto, referência); o saldo resultante de cada registro desconta os deltas
+# dos registros seguintes do mesmo produto, como se tivessem sido aplicados um a um
+APLICAR_MOVIMENTOS = text("""
+    WITH v AS (
+        SELECT * FROM unnest(CAST(:ids AS INT[]), CAST(:deltas AS INT[]), CAST(:referencias AS INT[]))
+            WITH ORDINALITY AS v(produto_id, delta, referencia_id, ordem)
+    ), total AS (
+        SELECT produto_id, SUM(delta) AS delta FROM v GROUP BY produto_id
+    ), atualizados AS (
+        UPDATE produtos p SET estoque_atual = p.estoque_atual + t.delta
+        FROM total t WHERE p.id = t.produto_id
+        RETURNING p.id, p.estoque_atual
+    ), movimentos AS (
+        INSERT INTO movimentos_estoque (produto_id, quantidade, tipo, referencia_id, estoque_resultante)
+        SELECT v.produto_id, v.delta, :tipo, v.referencia_id,
+               a.estoque_atual - COALESCE(SUM(v.delta) OVER (
+                   PARTITION BY v.produto_id ORDER BY v.ordem DESC ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+               ), 0)
+        FROM v JOIN atualizados a ON a.id = v.produto_id
+        ORDER BY v.ordem
+    )
+    SELECT id, estoque_atual FROM atualizados
+""")
+
+
+# cadastro de produtos com saldo: o estoque inicial entra no livro como saldo_inicial no mesmo statement
+# (services.criar_produto e a importação em massa)
+CRIAR_PRODUTOS = text("""
+    WITH novos AS (
+        INSERT INTO produtos (nome, estoque_atual, preco, fornecedor_id)
+        SELECT * FROM unnest(CAST(:nomes AS TEXT[]), CAST(:estoques AS INT[]), CAST(:precos AS NUMERIC[]),
+                             CAST(:fornecedores AS INT[]))
+        RETURNING id, nome, estoque_atual, preco, fornecedor_id
+    ), movimentos AS (
+        INSERT INTO movimentos_estoque (produto_id, quantidade, tipo, estoque_resultante)
+        SELECT id, estoque_atual, 'saldo_inicial', estoque_atual FROM novos WHERE estoque_atual <> 0
+    )
+    SELECT * FROM novos ORDER BY id
+""")
+
+
+class EstoqueInsuficiente(ValueError):
+    def __init__(self, saldos: dict):
+        self.saldos = saldos
+        super().__init__("Estoque insuficiente para: " + ", ".join(f"produto {p} ({s})" for p, s in saldos.items()))
+
+
+def travar_produtos(db, produto_ids) -> list:
+    # SELECT ... FOR NO KEY UPDATE em ordem crescente de id: a ordem global de travamento que evita deadlocks.
+    # NO KEY UPDATE não conflita com o KEY SHARE das chaves estrangeiras: um COPY em vendas (importação,
+    # ingestão) que já validou a FK destes produtos não trava nem é travado por um movimento de estoque
+    return db.execute(
+        select(Produto.id).where(Produto.id.in_(sorted(set(produto_ids)))).order_by(Produto.id)
+        .with_for_update(key_share=True)
+    ).scalars().all()
+
+
+def movimentar(db, itens, tipo: str, referencia_id: int | None = None, permitir_negativo: bool = True,
+               travados: bool = False) -> dict:
+    # itens: pares (produto_id, delta), ou trios (produto_id, delta, referencia_id) quando cada item vem de
+    # um documento diferente (vários pedidos numa tacada só); retorna {produto_id: estoque resultante}.
+    # travados=True: quem chama já travou esses produtos em ordem de id, na mesma transação.
+    # `db` pode ser uma Session ou uma Connection; em caso de erro quem chama deve dar rollback.
+    if tipo not in TIPOS_MOVIMENTO:
+        raise ValueError(f"Tipo de movimento inválido: {tipo}")
+    deltas = defaultdict(int)
+    for produto_id, delta, *referencia in itens:
+        ref = referencia[0] if referencia else referencia_id
+        deltas[int(produto_id), None if ref is None else int(ref)] += int(delta)
+    deltas = {chave: delta for chave, delta in sorted(deltas.items(), key=_ordem_movimento) if delta}
+    if not deltas:
+        return {}
+
+    produto_ids = sorted({produto_id for produto_id, _ in deltas})
+    if not travados:
+        encontrados = travar_produtos(db, produto_ids)
+        if len(encontrados) != len(produto_ids):
+            raise ValueError(f"Produto não encontrado: {sorted(set(produto_ids) - set(encontrados))}")
+
+    saldos = dict(db.execute(APLICAR_MOVIMENTOS, {
+        "ids": [produto_id for produto_id, _ in deltas], "deltas": list(deltas.values()),
+        "referencias": [ref for _, ref in deltas], "tipo": tipo,
+    }).all())
+    if not permitir_negativo:
+        negativos = {produto_id: saldo for produto_id, saldo in saldos.items() if saldo < 0}
+        if negativos:
+            raise EstoqueInsuficiente(negativos)
+    return saldos
+
+
+def _ordem_movimento(item):
+    (produto_id, referencia_id), _ = item
+    return produto_id, referencia_id is not None, referencia_id or 0
@@ -0,0 +1,256 @@
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.models import Fornecedor
+from utils.db import engine, SessionLocal
+from utils.cache import invalidar
+from utils.estoque import CRIAR_PRODUTOS, movimentar
+from utils.utils import (
+    normalizar_cnpj_serie, validar_cnpj_serie, normalizar_email_serie, validar_email_serie,
+    validar_telefone_serie, validar_nome_serie,
+)
+
+COLUNAS_VENDAS = ["produto_id", "quantidade", "data_venda"]
+TAMANHO_LOTE = 100_000
+LINHAS_POR_INSERT = 2_000
+# limites das colunas (migrations/0001): valores fora deles fariam o INSERT do lote inteiro falhar
+INT4_MAX = 2**31 - 1
+PRECO_MAX = 10**8  # NUMERIC(10, 2)
+TAMANHO_TEXTO = {"email": 100, "telefone": 20, "segmento": 100}
+
+
+def _ler_em_lotes(caminho, formato: str, colunas: list, tamanho_lote: int):
+    # nunca materializa o arquivo inteiro: CSV por chunksize, Parquet por row batches
+    if formato == "parquet":
+        import pyarrow.parquet as pq
+        arquivo = pq.ParquetFile(caminho)
+        for lote in arquivo.iter_batches(batch_size=tamanho_lote, columns=colunas):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(caminho, usecols=colunas, chunksize=tamanho_lote, dtype=str)
+
+
+def _formato(caminho, formato):
+    if formato:
+        return formato
+    return "parquet" if str(caminho).lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def _ids_produtos(cur) -> np.ndarray:
+    cur.execute("SELECT id FROM produtos")
+    return np.fromiter((linha[0] for linha in cur), dtype=np.int64)
+
+
+def importar_vendas(caminho, formato: str | None = None, tamanho_lote: int = TAMANHO_LOTE, rejeitadas=None) -> dict:
+    # importa vendas via COPY ... FROM STDIN em uma única transação;
+    # linhas inválidas ou de produtos inexistentes são descartadas (e gravadas em `rejeitadas`, se informado).
+    # A baixa de estoque sai na mesma transação, um movimento por produto com o total vendido no arquivo,
+    # aplicado só no fim para manter os produtos travados pelo menor tempo possível.
+    formato = _formato(caminho, formato)
+    inicio = time.perf_counter()
+    resultado = {"lidas": 0, "importadas": 0, "rejeitadas": 0}
+    cabecalho_rejeitadas = True
+
+    vendidos = pd.Series(dtype=np.int64)
+    with engine.begin() as conn:
+        with conn.connection.cursor() as cur:
+            ids_validos = _ids_produtos(cur)
+            for lote in _ler_em_lotes(caminho, formato, COLUNAS_VENDAS, tamanho_lote):
+                produto_id = pd.to_numeric(lote["produto_id"], errors="coerce")
+                quantidade = pd.to_numeric(lote["quantidade"], errors="coerce")
+                data_venda = pd.to_datetime(lote["data_venda"], errors="coerce")
+
+                # colunas INT: fora de 1..INT4_MAX o COPY falharia e desfaria o arquivo inteiro (como api_vendas._validar)
+                validas = (
+                    produto_id.between(1, INT4_MAX)
+                    & produto_id.isin(ids_validos)
+                    & quantidade.between(1, INT4_MAX)
+                    & (quantidade % 1 == 0)
+                    & data_venda.notna()
+                )
+                resultado["lidas"] += len(lote)
+                resultado["rejeitadas"] += int((~validas).sum())
+
+                if rejeitadas is not None and not validas.all():
+                    lote[~validas].to_csv(rejeitadas, index=False, header=cabecalho_rejeitadas)
+                    cabecalho_rejeitadas = False
+
+                if not validas.any():
+                    continue
+                buffer = io.StringIO()
+                linhas = pd.DataFrame({
+                    "produto_id": produto_id[validas].astype(np.int64),
+                    "quantidade": quantidade[validas].astype(np.int64),
+                    "data_venda": data_venda[validas],
+                })
+                linhas.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d")
+                buffer.seek(0)
+                cur.copy_expert(f"COPY vendas ({', '.join(COLUNAS_VENDAS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+                vendidos = vendidos.add(linhas.groupby("produto_id")["quantidade"].sum(), fill_value=0)
+                resultado["importadas"] += int(validas.sum())
+        movimentar(conn, ((produto, -quantidade) for produto, quantidade in vendidos.items()), "venda")
+
+    invalidar("vendas", "produtos")
+    resultado["segundos"] = time.perf_counter() - inicio
+    resultado["linhas_por_segundo"] = resultado["lidas"] / resultado["segundos"] if resultado["segundos"] else 0.0
+    return resultado
+
+
+def _validar(df: pd.DataFrame, regras: dict):
+    # regras: {(campo, mensagem): máscara das linhas inválidas}; devolve relatório por linha e máscara das válidas
+    regras = {chave: mascara.fillna(True).astype(bool) for chave, mascara in regras.items()}
+    erros = [
+        pd.DataFrame({"linha": df.index[mascara] + 1, "campo": campo, "erro": mensagem})
+        for (campo, mensagem), mascara in regras.items() if mascara.any()
+    ]
+    validas = ~np.logical_or.reduce([mascara.to_numpy() for mascara in regras.values()])
+    if not erros:
+        return pd.DataFrame(columns=["linha", "campo", "erro"]), validas
+    return pd.concat(erros, ignore_index=True).sort_values("linha", kind="stable", ignore_index=True), validas
+
+
+def _texto(df: pd.DataFrame, coluna: str) -> pd.Series:
+    if coluna not in df:
+        return pd.Series(pd.NA, index=df.index, dtype="string")
+    return df[coluna].astype("string").str.strip().replace("", pd.NA)
+
+
+def _inserir_em_lotes(db: Session, montar_insert, registros: list) -> int:
+    for i in range(0, len(registros), LINHAS_POR_INSERT):
+        db.execute(montar_insert(registros[i:i + LINHAS_POR_INSERT]))
+    return len(registros)
+
+
+def importar_fornecedores(db: Session, df: pd.DataFrame) -> dict:
+    # valida colunas inteiras de uma vez e grava os válidos com INSERT ... ON CONFLICT (cnpj) DO UPDATE
+    df = df.reset_index(drop=True)
+    nome = _texto(df, "nome")
+    cnpj = normalizar_cnpj_serie(_texto(df, "cnpj"))
+    email = normalizar_email_serie(_texto(df, "email"))
+    telefone = _texto(df, "telefone")
+    segmento = _texto(df, "segmento")
+
+    regras = {
+        ("Nome", "Nome deve conter apenas letras e espaços (mín. 2, máx. 100 caracteres)."): ~validar_nome_serie(nome),
+        ("CNPJ", "CNPJ inválido (tamanho ou dígitos verificadores)."): ~validar_cnpj_serie(cnpj),
+        ("Email", "Formato de email inválido."): email.notna() & ~validar_email_serie(email),
+        ("Telefone", "Telefone deve ter entre 8 e 20 dígitos."): telefone.notna() & ~validar_telefone_serie(telefone),
+    }
+    for campo, serie in (("email", email), ("telefone", telefone), ("segmento", segmento)):
+        limite = TAMANHO_TEXTO[campo]
+        regras[(campo.capitalize(), f"{campo.capitalize()} deve ter no máximo {limite} caracteres.")] = \
+            serie.str.len().gt(limite).fillna(False)
+    # o mesmo CNPJ duas vezes no arquivo: vale a última ocorrência
+    regras[("CNPJ", "CNPJ repetido no arquivo; mantida a última ocorrência.")] = cnpj.ne("") & cnpj.duplicated(keep="last")
+    erros, validas = _validar(df, regras)
+
+    registros = pd.DataFrame({
+        "nome": nome, "cnpj": cnpj, "email": email, "telefone": telefone, "segmento": segmento,
+    })[validas].astype(object).where(lambda d: d.notna(), None).to_dict("records")
+
+    def montar_insert(lote):
+        stmt = pg_insert(Fornecedor.__table__).values(lote)
+        return stmt.on_conflict_do_update(
+            index_elements=["cnpj"],
+            set_={c: stmt.excluded[c] for c in ("nome", "email", "telefone", "segmento")},
+        )
+
+    gravados = _inserir_em_lotes(db, montar_insert, registros)
+    db.commit()
+    invalidar("fornecedores")
+    return {"gravados": gravados, "rejeitados": int((~validas).sum()), "erros": erros}
+
+
+def importar_produtos(db: Session, df: pd.DataFrame) -> dict:
+    # fornecedor opcional, informado por fornecedor_cnpj ou fornecedor_id e resolvido em uma única consulta
+    df = df.reset_index(drop=True)
+    nome = _texto(df, "nome")
+    estoque_texto = _texto(df, "estoque_atual")
+    estoque = pd.to_numeric(estoque_texto, errors="coerce")
+    preco = pd.to_numeric(_texto(df, "preco").str.replace(",", ".", regex=False), errors="coerce")
+
+    fornecedor_id = pd.to_numeric(_texto(df, "fornecedor_id"), errors="coerce")
+    cnpj_fornecedor = normalizar_cnpj_serie(_texto(df, "fornecedor_cnpj"))
+    cnpjs = cnpj_fornecedor[cnpj_fornecedor.ne("")].unique().tolist()
+    ids = fornecedor_id[fornecedor_id.between(1, INT4_MAX)].astype(int).unique().tolist()
+    existentes = db.query(Fornecedor.id, Fornecedor.cnpj).filter(
+        or_(Fornecedor.cnpj.in_(cnpjs), Fornecedor.id.in_(ids))
+    ).all() if cnpjs or ids else []
+    por_cnpj = {cnpj: id_ for id_, cnpj in existentes}
+    ids_existentes = set(por_cnpj.values())
+    fornecedor_id = fornecedor_id.where(cnpj_fornecedor.eq(""), cnpj_fornecedor.map(por_cnpj))
+
+    regras = {
+        ("Nome", "O nome do produto é obrigatório (máx. 100 caracteres)."): nome.isna() | nome.str.len().gt(100).fillna(False),
+        ("Estoque", f"Estoque deve ser um inteiro entre 0 e {INT4_MAX}."): (estoque_texto.notna() & estoque.isna())
+                                                                          | (estoque < 0) | (estoque > INT4_MAX)
+                                                                          | (estoque % 1 != 0),
+        ("Preço", "Preço deve ser um número maior ou igual a zero e menor que 100.000.000."):
+            preco.isna() | (preco < 0) | (preco.round(2) >= PRECO_MAX),
+        ("Fornecedor", "Fornecedor não encontrado."): (cnpj_fornecedor.ne("") | _texto(df, "fornecedor_id").notna())
+                                                     & ~fornecedor_id.isin(ids_existentes),
+    }
+    erros, validas = _validar(df, regras)
+
+    registros = pd.DataFrame({
+        "nome": nome,
+        # inválidas viram 0 antes do cast: um estoque fora de INT4 (ou infinito) não cabe em int64 com segurança
+        "estoque_atual": estoque.where(validas, 0).fillna(0).astype(np.int64),
+        "preco": preco.round(2),
+        "fornecedor_id": fornecedor_id.astype("Int64"),
+    })[validas].astype(object).where(lambda d: d.notna(), None).to_dict("records")
+
+    # mesmo INSERT de services.criar_produto: o estoque importado entra no livro como saldo_inicial
+    gravados = _inserir_em_lotes(db, lambda lote: CRIAR_PRODUTOS.bindparams(
+        nomes=[r["nome"] for r in lote], estoques=[r["estoque_atual"] for r in lote],
+        precos=[r["preco"] for r in lote], fornecedores=[r["fornecedor_id"] for r in lote],
+    ), registros)
+    db.commit()
+    invalidar("produtos")
+    return {"gravados": gravados, "rejeitados": int((~validas).sum()), "erros": erros}
+
+
+def _imprimir(resultado: dict):
+    print(
+        f"{resultado['importadas']} importadas, {resultado['rejeitadas']} rejeitadas de {resultado['lidas']} lidas "
+        f"em {resultado['segundos']:.2f}s ({resultado['linhas_por_segundo']:,.0f} linhas/s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importação em massa")
+    sub = parser.add_subparsers(dest="tipo", required=True)
+
+    p_vendas = sub.add_parser("vendas", help="importa vendas de CSV ou Parquet via COPY")
+    p_vendas.add_argument("arquivo")
+    p_vendas.add_argument("--formato", choices=["csv", "parquet"])
+    p_vendas.add_argument("--lote", type=int, default=TAMANHO_LOTE)
+    p_vendas.add_argument("--rejeitadas", help="CSV onde gravar as linhas descartadas")
+
+    for tipo in ("fornecedores", "produtos"):
+        p_cadastro = sub.add_parser(tipo, help=f"importa {tipo} de CSV com validação em massa")
+        p_cadastro.add_argument("arquivo")
+        p_cadastro.add_argument("--erros", help="CSV onde gravar o relatório de erros por linha")
+
+    args = parser.parse_args()
+    if args.tipo in ("fornecedores", "produtos"):
+        importar = importar_fornecedores if args.tipo == "fornecedores" else importar_produtos
+        with SessionLocal() as db:
+            resultado = importar(db, pd.read_csv(args.arquivo, dtype=str, keep_default_na=False))
+        print(f"{resultado['gravados']} {args.tipo} gravados, {resultado['rejeitados']} rejeitados.")
+        if args.erros:
+            resultado["erros"].to_csv(args.erros, index=False)
+    elif args.tipo == "vendas":
+        if args.rejeitadas:
+            with open(args.rejeitadas, "w", newline="", encoding="utf-8") as destino:
+                _imprimir(importar_vendas(args.arquivo, args.formato, args.lote, rejeitadas=destino))
+        else:
+            _imprimir(importar_vendas(args.arquivo, args.formato, args.lote))
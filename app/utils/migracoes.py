@@ -0,0 +1,110 @@
+import argparse
+import re
+import time
+from pathlib import Path
+
+from utils.db import engine
+
+MIGRACOES_DIR = Path(__file__).resolve().parent.parent / "migrations"
+SEED = Path(__file__).resolve().parent.parent / "init_db.sql"
+MARCADOR_SEM_TRANSACAO = "-- sem-transacao"
+LOCK_MIGRACOES = 727_001  # chave do advisory lock: um único processo migra por vez
+# envia o SQL cru ao driver: sem isso o psycopg2 interpreta '%' (ex.: format('%I') em plpgsql)
+SEM_PARAMETROS = {"no_parameters": True}
+
+
+def listar_migracoes() -> list:
+    migracoes = []
+    for arquivo in sorted(MIGRACOES_DIR.glob("*.sql")):
+        versao = re.match(r"(\d+)_", arquivo.name)
+        if versao:
+            migracoes.append((int(versao.group(1)), arquivo))
+    return migracoes
+
+
+def _comandos(sql: str) -> list:
+    # arquivos sem transação contêm apenas comandos simples separados por ';' no fim da linha
+    return [c.strip() for c in re.split(r";\s*$", sql, flags=re.MULTILINE) if c.strip() and not _so_comentarios(c)]
+
+
+def _so_comentarios(comando: str) -> bool:
+    return all(not linha.strip() or linha.strip().startswith("--") for linha in comando.splitlines())
+
+
+def _aplicar(versao: int, arquivo: Path):
+    sql = arquivo.read_text(encoding="utf-8")
+    inicio = time.perf_counter()
+
+    if sql.lstrip().startswith(MARCADOR_SEM_TRANSACAO):
+        # ex.: CREATE INDEX CONCURRENTLY; os comandos devem ser idempotentes (IF NOT EXISTS)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for comando in _comandos(sql):
+                conn.exec_driver_sql(comando, execution_options=SEM_PARAMETROS)
+        with engine.begin() as conn:
+            _registrar(conn, versao, arquivo, inicio)
+    else:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql, execution_options=SEM_PARAMETROS)
+            _registrar(conn, versao, arquivo, inicio)
+
+
+def _registrar(conn, versao: int, arquivo: Path, inicio: float):
+    conn.exec_driver_sql(
+        "INSERT INTO schema_migrations (versao, nome, duracao_ms) VALUES (%(versao)s, %(nome)s, %(duracao)s)",
+        {"versao": versao, "nome": arquivo.name, "duracao": int(1000 * (time.perf_counter() - inicio))},
+    )
+
+
+def migrar(ate: int | None = None) -> list:
+    aplicadas_agora = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+        lock.exec_driver_sql(f"SELECT pg_advisory_lock({LOCK_MIGRACOES})")
+        try:
+            lock.exec_driver_sql(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                " versao INT PRIMARY KEY, nome TEXT NOT NULL,"
+                " aplicada_em TIMESTAMPTZ NOT NULL DEFAULT now(), duracao_ms INT)"
+            )
+            aplicadas = {linha[0] for linha in lock.exec_driver_sql("SELECT versao FROM schema_migrations")}
+            for versao, arquivo in listar_migracoes():
+                if versao in aplicadas or (ate is not None and versao > ate):
+                    continue
+                print(f"Aplicando {arquivo.name}...")
+                _aplicar(versao, arquivo)
+                aplicadas_agora.append(arquivo.name)
+        finally:
+            lock.exec_driver_sql(f"SELECT pg_advisory_unlock({LOCK_MIGRACOES})")
+    return aplicadas_agora
+
+
+def semear():
+    # dados de demonstração; só roda em banco vazio
+    with engine.begin() as conn:
+        if conn.exec_driver_sql("SELECT EXISTS (SELECT 1 FROM produtos)").scalar():
+            return False
+        conn.exec_driver_sql(SEED.read_text(encoding="utf-8"), execution_options=SEM_PARAMETROS)
+    return True
+
+
+def status() -> list:
+    with engine.connect() as conn:
+        existe = conn.exec_driver_sql("SELECT to_regclass('schema_migrations') IS NOT NULL").scalar()
+        aplicadas = dict(conn.exec_driver_sql("SELECT versao, aplicada_em FROM schema_migrations").all()) if existe else {}
+    return [(arquivo.name, aplicadas.get(versao)) for versao, arquivo in listar_migracoes()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrações versionadas do banco")
+    parser.add_argument("--ate", type=int, help="aplica somente até esta versão")
+    parser.add_argument("--seed", action="store_true", help="carrega os dados de demonstração em banco vazio")
+    parser.add_argument("--status", action="store_true", help="lista as migrações e quando foram aplicadas")
+    args = parser.parse_args()
+
+    if args.status:
+        for nome, aplicada_em in status():
+            print(f"{nome:45} {aplicada_em or 'pendente'}")
+    else:
+        aplicadas = migrar(args.ate)
+        print(f"{len(aplicadas)} migração(ões) aplicada(s).")
+        if args.seed and semear():
+            print("Dados de demonstração carregados.")
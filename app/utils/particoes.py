@@ -0,0 +1,111 @@
+import argparse
+import os
+import re
+from datetime import date
+from pathlib import Path
+
+from utils.db import engine
+
+ARQUIVO_DIR = Path(os.getenv("VENDAS_ARQUIVO_DIR", "/app/arquivo/vendas"))
+MESES_A_FRENTE = int(os.getenv("VENDAS_MESES_A_FRENTE", "3"))
+MESES_RETENCAO = int(os.getenv("VENDAS_MESES_RETENCAO", "24"))
+LINHAS_POR_LOTE = 100_000
+
+
+def garantir_particoes(meses_a_frente: int = MESES_A_FRENTE) -> int:
+    # cria as partições do mês corrente até `meses_a_frente` meses adiante
+    with engine.begin() as conn:
+        return conn.exec_driver_sql(
+            "SELECT vendas_garantir_particoes(CURRENT_DATE, (CURRENT_DATE + make_interval(months => %(meses)s))::date)",
+            {"meses": meses_a_frente},
+        ).scalar()
+
+
+def listar_particoes() -> list:
+    # partições mensais (vendas_AAAA_MM) em ordem cronológica, como (nome, primeiro dia do mês)
+    with engine.connect() as conn:
+        nomes = conn.exec_driver_sql(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'vendas'::regclass"
+        ).scalars().all()
+    particoes = []
+    for nome in nomes:
+        mes = re.fullmatch(r"vendas_(\d{4})_(\d{2})", nome)
+        if mes:
+            particoes.append((nome, date(int(mes.group(1)), int(mes.group(2)), 1)))
+    return sorted(particoes, key=lambda p: p[1])
+
+
+def _mes_limite(meses_retencao: int) -> date:
+    hoje = date.today().replace(day=1)
+    total = hoje.year * 12 + hoje.month - 1 - meses_retencao
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _exportar_parquet(nome: str, destino: Path):
+    # cursor do lado do servidor: a memória fica limitada a um lote, qualquer que seja o tamanho da partição
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    temporario = destino.with_suffix(".parquet.tmp")
+    escritor = None
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor(name=f"arquivar_{nome}") as cur:
+            cur.itersize = LINHAS_POR_LOTE
+            cur.execute(f'SELECT id, produto_id, quantidade, data_venda FROM "{nome}" ORDER BY id')
+            while True:
+                linhas = cur.fetchmany(LINHAS_POR_LOTE)
+                if not linhas:
+                    break
+                tabela = pa.Table.from_pylist(
+                    [dict(zip(("id", "produto_id", "quantidade", "data_venda"), linha)) for linha in linhas]
+                )
+                if escritor is None:
+                    escritor = pq.ParquetWriter(temporario, tabela.schema, compression="zstd")
+                escritor.write_table(tabela)
+        conn.commit()
+    finally:
+        conn.close()
+        if escritor is not None:
+            escritor.close()
+    if escritor is None:
+        return False
+    temporario.replace(destino)
+    return True
+
+
+def arquivar_particoes(meses_retencao: int = MESES_RETENCAO, destino: Path = ARQUIVO_DIR) -> list:
+    # partições anteriores à janela de retenção: DETACH, exporta para Parquet (zstd) e só então DROP.
+    # O rollup vendas_diarias não é afetado: DETACH/DROP não disparam os triggers de DELETE.
+    # Se a exportação falhar, a partição fica desanexada (dados intactos) para reprocessamento manual.
+    destino.mkdir(parents=True, exist_ok=True)
+    limite = _mes_limite(meses_retencao)
+    arquivadas = []
+    for nome, mes in listar_particoes():
+        if mes >= limite:
+            break
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f'ALTER TABLE vendas DETACH PARTITION "{nome}"')
+        _exportar_parquet(nome, destino / f"{nome}.parquet")
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f'DROP TABLE "{nome}"')
+        arquivadas.append(nome)
+    return arquivadas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manutenção das partições mensais de vendas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_garantir = sub.add_parser("garantir", help="cria as partições dos próximos meses")
+    p_garantir.add_argument("--meses", type=int, default=MESES_A_FRENTE)
+    p_arquivar = sub.add_parser("arquivar", help="exporta e remove partições fora da retenção")
+    p_arquivar.add_argument("--reter", type=int, default=MESES_RETENCAO, help="meses mantidos no banco")
+    p_arquivar.add_argument("--destino", type=Path, default=ARQUIVO_DIR)
+    args = parser.parse_args()
+
+    if args.comando == "garantir":
+        print(f"{garantir_particoes(args.meses)} partição(ões) criada(s).")
+    else:
+        arquivadas = arquivar_particoes(args.reter, args.destino)
+        print(f"{len(arquivadas)} partição(ões) arquivada(s): {', '.join(arquivadas) or '-'}")
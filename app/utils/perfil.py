@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+import streamlit as st
+
+from utils.cache import estatisticas_cache
+from utils.db import estatisticas_pool, perfilar_consultas
+
+PERFIL_LOG = os.getenv("PERFIL_LOG", "/app/logs/perfil.jsonl")  # vazio desativa o log
+PERFIL_LOG_MAX_BYTES = int(os.getenv("PERFIL_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+PERFIL_LOG_ARQUIVOS = int(os.getenv("PERFIL_LOG_ARQUIVOS", "5"))
+LIMITE_REPETICOES = 3  # o mesmo statement 3+ vezes num rerun é a assinatura de um N+1
+CONSULTAS_NO_PAINEL = 10
+
+
+def _logger() -> logging.Logger:
+    logger = logging.getLogger("estoques.perfil")
+    if not logger.handlers and PERFIL_LOG:
+        Path(PERFIL_LOG).parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(PERFIL_LOG, maxBytes=PERFIL_LOG_MAX_BYTES, backupCount=PERFIL_LOG_ARQUIVOS,
+                                      encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def resumir(pagina: str, consultas: list, total_ms: float) -> dict:
+    sql_ms = sum(c["ms"] for c in consultas)
+    contagem = Counter(c["sql"] for c in consultas)
+    repetidas = [
+        {"sql": sql, "vezes": vezes, "ms": sum(c["ms"] for c in consultas if c["sql"] == sql)}
+        for sql, vezes in contagem.most_common() if vezes >= LIMITE_REPETICOES
+    ]
+    return {
+        "data": datetime.now().isoformat(timespec="milliseconds"),
+        "pagina": pagina,
+        "consultas": len(consultas),
+        "linhas_afetadas": sum(c["linhas_afetadas"] or 0 for c in consultas),
+        "total_ms": round(total_ms, 2),
+        "sql_ms": round(sql_ms, 2),
+        # tudo o que não é espera pelo banco: pandas, montagem dos gráficos e envio dos elementos
+        "render_ms": round(max(total_ms - sql_ms, 0.0), 2),
+        "repetidas": repetidas,
+        "mais_lentas": sorted(consultas, key=lambda c: c["ms"], reverse=True)[:CONSULTAS_NO_PAINEL],
+    }
+
+
+@contextmanager
+def perfilar_pagina(pagina: str):
+    # mede a página inteira e as consultas dela; o resumo vai para o log mesmo se a página interromper o rerun
+    perfil = {}
+    inicio = time.perf_counter()
+    with perfilar_consultas() as consultas:
+        try:
+            yield perfil
+        finally:
+            perfil.update(resumir(pagina, consultas, 1000 * (time.perf_counter() - inicio)))
+            if PERFIL_LOG:
+                _logger().info(json.dumps(perfil, ensure_ascii=False, default=str))
+
+
+def painel_perfil(perfil: dict):
+    with st.sidebar.expander("Desempenho", expanded=True):
+        st.caption(f"Página: {perfil['pagina']}")
+        st.write(f"Consultas: {perfil['consultas']} · linhas afetadas/devolvidas: {perfil['linhas_afetadas']}")
+        st.write(f"Total: {perfil['total_ms']:.0f} ms · SQL: {perfil['sql_ms']:.0f} ms · "
+                 f"render: {perfil['render_ms']:.0f} ms")
+        for repetida in perfil["repetidas"]:
+            st.warning(f"Statement repetido {repetida['vezes']}x ({repetida['ms']:.0f} ms) — possível N+1:\n\n"
+                       f"`{repetida['sql'][:300]}`")
+        if perfil["mais_lentas"]:
+            st.caption("Consultas mais lentas")
+            st.dataframe(
+                [{"ms": round(c["ms"], 2), "linhas_afetadas": c["linhas_afetadas"], "sql": c["sql"][:200]} for c in perfil["mais_lentas"]],
+                use_container_width=True,
+            )
+        cache = estatisticas_cache()
+        st.caption(f"Cache: {cache['hits']} hits · {cache['misses']} misses · "
+                   f"{100 * cache['taxa_acerto']:.0f}% de acerto · {cache['entradas']} entradas")
+        for nome, pool in estatisticas_pool().items():
+            st.caption(f"Pool {nome}: espera média {pool['espera_media_ms']:.1f} ms · "
+                       f"máx {pool['espera_max_ms']:.1f} ms · {pool['timeouts']} timeouts")
@@ -0,0 +1,90 @@
+import argparse
+import json
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from models.models import Produto, Venda, VendaDiaria, Pedido, Fornecedor
+from utils.db import engine
+from utils.relatorios import LINHAS_PREVIA, consulta_relatorio
+
+
+def consultas_dashboard() -> dict:
+    # as consultas quentes do dashboard e das listagens, com parâmetros representativos
+    limite = date.today() - timedelta(days=30)
+    return {
+        "cubo_vendas": select(VendaDiaria.produto_id, VendaDiaria.dia, VendaDiaria.quantidade)
+            .where(VendaDiaria.dia.between(limite, date.today())),
+        "media_vendas_produto": select(func.sum(Venda.quantidade))
+            .where(Venda.produto_id == 1, Venda.data_venda >= limite),
+        "vendas_diarias_brutas": select(Venda.data_venda, func.sum(Venda.quantidade))
+            .where(Venda.data_venda >= limite).group_by(Venda.data_venda),
+        "pedidos_por_status": select(Pedido.status, func.count(Pedido.id)).group_by(Pedido.status),
+        "pedidos_pendentes_pagina": select(Pedido.id, Pedido.quantidade)
+            .where(Pedido.status == "pendente").order_by(Pedido.id).limit(51),
+        "pedidos_do_produto": select(Pedido.id).where(Pedido.produto_id == 1),
+        "produtos_prefixo": select(Produto.id, Produto.nome)
+            .where(Produto.nome.startswith("Sa", autoescape=True)).order_by(Produto.id).limit(51),
+        "relatorio_vendas_previa": consulta_relatorio(data_ini=limite).limit(LINHAS_PREVIA + 1),
+        "relatorio_vendas_semana": consulta_relatorio(data_ini=date.today() - timedelta(days=365), agrupamento="semana"),
+        "relatorio_vendas_fornecedor": consulta_relatorio(data_ini=limite, agrupamento="fornecedor"),
+    }
+
+
+def explicar(analisar: bool = True) -> dict:
+    opcoes = "ANALYZE, BUFFERS, FORMAT JSON" if analisar else "FORMAT JSON"
+    planos = {}
+    with engine.connect() as conn:
+        for nome, stmt in consultas_dashboard().items():
+            compilado = stmt.compile(dialect=engine.dialect)
+            plano = conn.exec_driver_sql(f"EXPLAIN ({opcoes}) {compilado}", compilado.params).scalar()
+            planos[nome] = {"sql": str(compilado), "plano": plano}
+    return planos
+
+
+def _nos(plano: dict):
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from _nos(filho)
+
+
+def resumo(plano) -> dict:
+    # nó raiz, custo, tempo e os tipos de varredura usados em cada tabela
+    raiz = plano[0]["Plan"]
+    return {
+        "no": raiz["Node Type"],
+        "custo": raiz["Total Cost"],
+        "tempo_ms": raiz.get("Actual Total Time"),
+        "varreduras": sorted({f"{n['Node Type']} {n['Relation Name']}" for n in _nos(raiz) if "Relation Name" in n}),
+    }
+
+
+def comparar(antes: dict, depois: dict) -> list:
+    # uma linha por consulta presente nos dois arquivos
+    linhas = []
+    for nome in [n for n in depois if n in antes]:
+        a, d = resumo(antes[nome]["plano"]), resumo(depois[nome]["plano"])
+        linhas.append(f"{nome:28} custo {a['custo']:>10} -> {d['custo']:<10} tempo {a['tempo_ms']} -> {d['tempo_ms']}")
+        if a["varreduras"] != d["varreduras"]:
+            linhas.append(f"{'':28} {', '.join(a['varreduras'])} -> {', '.join(d['varreduras'])}")
+    return linhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grava os planos de execução das consultas do dashboard")
+    parser.add_argument("saida", help="arquivo JSON de saída, ex.: planos_antes.json")
+    parser.add_argument("--sem-analyze", action="store_true", help="só estima, sem executar as consultas")
+    parser.add_argument("--comparar", help="JSON gravado antes (ex.: planos_antes.json) para comparar com a saída")
+    args = parser.parse_args()
+
+    planos = explicar(analisar=not args.sem_analyze)
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(planos, arquivo, ensure_ascii=False, indent=2, default=str)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            for linha in comparar(json.load(arquivo), planos):
+                print(linha)
+    else:
+        for nome, dados in planos.items():
+            r = resumo(dados["plano"])
+            print(f"{nome:28} {r['no']:20} custo={r['custo']:>10} tempo={r['tempo_ms'] or '-'}")
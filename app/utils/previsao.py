@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from utils.cache import cache_leitura, CACHE_TTL_VENDAS
+from utils.cubo import CuboVendas, carregar_cubo_vendas
+
+# Todos os modelos ajustam todos os produtos de uma vez sobre a matriz produtos x dias do cubo.
+
+
+def tendencia_linear(matriz: np.ndarray):
+    # mínimos quadrados fechados por linha: inclinação = cov(t, y) / var(t)
+    dias = matriz.shape[1]
+    t = np.arange(dias, dtype=np.float64)
+    t_centrado = t - t.mean()
+    variancia = t_centrado @ t_centrado
+    media = matriz.mean(axis=1)
+    inclinacao = (matriz - media[:, None]) @ t_centrado / variancia if variancia else np.zeros(len(matriz))
+    intercepto = media - inclinacao * t.mean()
+    return intercepto, inclinacao
+
+
+def media_movel(matriz: np.ndarray, janela: int = 7) -> np.ndarray:
+    # equivalente a rolling(janela, min_periods=1).mean() em cada linha, via somas acumuladas
+    acumulada = np.cumsum(np.pad(matriz, ((0, 0), (1, 0))), axis=1)
+    fim = np.arange(1, matriz.shape[1] + 1)
+    inicio = np.maximum(fim - janela, 0)
+    return (acumulada[:, fim] - acumulada[:, inicio]) / (fim - inicio)
+
+
+def suavizacao_exponencial(matriz: np.ndarray, alfa: float = 0.3) -> np.ndarray:
+    # s_t = alfa * y_t + (1 - alfa) * s_{t-1}, s_0 = y_0, escrito como um único produto de matrizes
+    dias = matriz.shape[1]
+    t = np.arange(dias)
+    defasagem = t[:, None] - t[None, :]
+    pesos = np.where(defasagem >= 0, alfa * (1 - alfa) ** np.clip(defasagem, 0, None), 0.0)
+    pesos[:, 0] = (1 - alfa) ** t
+    return matriz @ pesos.T
+
+
+@dataclass
+class PrevisaoDemanda:
+    cubo: CuboVendas
+    datas_futuras: list
+    media_movel: np.ndarray
+    suavizada: np.ndarray
+    tendencia: np.ndarray
+    previsao_tendencia: np.ndarray
+    previsao_media_movel: np.ndarray
+    previsao_suavizada: np.ndarray
+
+    def linha(self, produto_id: int) -> int:
+        return self.cubo.indice_produto[produto_id]
+
+
+def calcular_previsao(cubo: CuboVendas, horizonte: int = 14, janela: int = 7, alfa: float = 0.3) -> PrevisaoDemanda:
+    matriz = cubo.matriz
+    intercepto, inclinacao = tendencia_linear(matriz)
+    t = np.arange(cubo.dias)
+    t_futuro = np.arange(cubo.dias, cubo.dias + horizonte)
+
+    mm = media_movel(matriz, janela)
+    suavizada = suavizacao_exponencial(matriz, alfa)
+    ultimo_dia = cubo.datas[-1] if cubo.datas else None
+
+    return PrevisaoDemanda(
+        cubo=cubo,
+        datas_futuras=[ultimo_dia + timedelta(days=i) for i in range(1, horizonte + 1)] if ultimo_dia else [],
+        media_movel=mm,
+        suavizada=suavizada,
+        tendencia=intercepto[:, None] + inclinacao[:, None] * t,
+        previsao_tendencia=np.maximum(0, intercepto[:, None] + inclinacao[:, None] * t_futuro),
+        previsao_media_movel=np.repeat(mm[:, -1:], horizonte, axis=1),
+        previsao_suavizada=np.repeat(suavizada[:, -1:], horizonte, axis=1),
+    )
+
+
+@cache_leitura("vendas", "produtos", ttl=CACHE_TTL_VENDAS)
+def prever_demanda(db: Session, dias_historico: int = 30, horizonte: int = 14, janela: int = 7,
+                   alfa: float = 0.3) -> PrevisaoDemanda:
+    # cacheado por versão dos dados: trocar o produto exibido não refaz o ajuste
+    return calcular_previsao(carregar_cubo_vendas(db, dias=dias_historico), horizonte, janela, alfa)
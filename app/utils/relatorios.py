@@ -0,0 +1,154 @@
+import argparse
+import csv
+import io
+from datetime import date, timedelta
+
+from sqlalchemy import BigInteger, Date, Float, cast, func, select
+from sqlalchemy.orm import Session
+
+from models.models import Produto, Venda, VendaDiaria, Fornecedor
+from utils.db import read_engine
+
+LINHAS_PREVIA = 100
+LINHAS_POR_LOTE = 50_000
+AGRUPAMENTOS = {None: "Sem agrupamento (vendas)", "dia": "Por dia", "semana": "Por semana", "fornecedor": "Por fornecedor",
+               "produto": "Por produto (mais vendidos e giro)"}
+MOTORES = {"postgres": "Postgres (tempo real)", "duckdb": "Espelho analítico (DuckDB)"}
+SEM_FORNECEDOR = "Sem fornecedor"
+
+
+def consulta_relatorio(produto: str | None = None, fornecedor: str | None = None, data_ini: date | None = None,
+                       data_fim: date | None = None, agrupamento: str | None = None):
+    # linhas de venda vêm de vendas; os agrupamentos somam direto no rollup vendas_diarias, no banco
+    data_fim = data_fim or date.today()
+    data_ini = data_ini or data_fim - timedelta(days=30)
+    # outer join: vendas de produtos sem fornecedor entram nos totais, no grupo SEM_FORNECEDOR
+    nome_fornecedor = func.coalesce(Fornecedor.nome, SEM_FORNECEDOR)
+    if agrupamento is None:
+        stmt = select(Produto.nome.label("Produto"), Venda.data_venda.label("Data"), Venda.quantidade.label("Quantidade"),
+                      nome_fornecedor.label("Fornecedor")) \
+            .select_from(Produto).join(Venda, Venda.produto_id == Produto.id).outerjoin(Fornecedor, Produto.fornecedor_id == Fornecedor.id) \
+            .where(Venda.data_venda.between(data_ini, data_fim)) \
+            .order_by(Venda.data_venda, Venda.id)
+    elif agrupamento == "produto":
+        total = cast(func.sum(VendaDiaria.quantidade), BigInteger)
+        stmt = select(Produto.nome.label("Produto"), total.label("Quantidade"), Produto.estoque_atual.label("Estoque"),
+                      (cast(func.sum(VendaDiaria.quantidade), Float) / func.nullif(Produto.estoque_atual, 0)).label("Giro")) \
+            .select_from(VendaDiaria).join(Produto, VendaDiaria.produto_id == Produto.id) \
+            .outerjoin(Fornecedor, Produto.fornecedor_id == Fornecedor.id) \
+            .where(VendaDiaria.dia.between(data_ini, data_fim)) \
+            .group_by(Produto.id, Produto.nome, Produto.estoque_atual).order_by(total.desc(), Produto.id)
+    else:
+        chave = {
+            "dia": VendaDiaria.dia.label("Dia"),
+            "semana": cast(func.date_trunc("week", VendaDiaria.dia), Date).label("Semana"),
+            "fornecedor": nome_fornecedor.label("Fornecedor"),
+        }[agrupamento]
+        stmt = select(chave, cast(func.sum(VendaDiaria.quantidade), BigInteger).label("Quantidade")) \
+            .select_from(VendaDiaria).join(Produto, VendaDiaria.produto_id == Produto.id) \
+            .outerjoin(Fornecedor, Produto.fornecedor_id == Fornecedor.id) \
+            .where(VendaDiaria.dia.between(data_ini, data_fim)) \
+            .group_by(chave).order_by(chave)
+    if produto:
+        stmt = stmt.where(Produto.nome == produto)
+    if fornecedor == SEM_FORNECEDOR:
+        stmt = stmt.where(Produto.fornecedor_id.is_(None))
+    elif fornecedor:
+        stmt = stmt.where(Fornecedor.nome == fornecedor)
+    return stmt
+
+
+def previa_relatorio(db: Session, stmt, limite: int = LINHAS_PREVIA, motor: str = "postgres"):
+    # só a primeira página; a linha extra indica se há mais para exportar
+    import pandas as pd
+
+    if motor == "duckdb":
+        lotes = _lotes(stmt.limit(limite + 1), limite + 1, motor)
+        colunas, linhas = next(lotes, (list(stmt.selected_columns.keys()), []))
+        lotes.close()
+    else:
+        resultado = db.execute(stmt.limit(limite + 1))
+        colunas, linhas = list(resultado.keys()), resultado.all()
+    return pd.DataFrame.from_records(linhas[:limite], columns=colunas), len(linhas) > limite
+
+
+def _lotes(stmt, tamanho_lote: int, motor: str = "postgres"):
+    # Postgres: cursor do lado do servidor (stream_results), o banco entrega o resultado em lotes.
+    # DuckDB: o mesmo SQL sobre o espelho Parquet, lido com fetchmany.
+    # Nos dois casos a memória do app fica em um lote qualquer que seja o período.
+    if motor == "duckdb":
+        from utils.espelho import compilar_duckdb, conectar_duckdb
+
+        sql, parametros = compilar_duckdb(stmt)
+        conn = conectar_duckdb()
+        try:
+            cursor = conn.execute(sql, parametros)
+            colunas = [descricao[0] for descricao in cursor.description]
+            while lote := cursor.fetchmany(tamanho_lote):
+                yield colunas, lote
+        finally:
+            conn.close()
+        return
+    with read_engine.connect() as conn:
+        resultado = conn.execution_options(stream_results=True, max_row_buffer=tamanho_lote).execute(stmt)
+        colunas = list(resultado.keys())
+        for lote in resultado.partitions(tamanho_lote):
+            yield colunas, lote
+
+
+def _exportar_csv(stmt, destino, tamanho_lote: int, motor: str) -> int:
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="")
+    escritor = csv.writer(texto)
+    total = 0
+    escritor.writerow(stmt.selected_columns.keys())
+    for _, lote in _lotes(stmt, tamanho_lote, motor):
+        escritor.writerows(lote)
+        total += len(lote)
+    texto.flush()
+    texto.detach()
+    return total
+
+
+def _exportar_parquet(stmt, destino, tamanho_lote: int, motor: str) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tipos = {"Produto": pa.string(), "Fornecedor": pa.string(), "Quantidade": pa.int64(), "Data": pa.date32(),
+             "Dia": pa.date32(), "Semana": pa.date32(), "Estoque": pa.int64(), "Giro": pa.float64()}
+    schema = pa.schema([(nome, tipos[nome]) for nome in stmt.selected_columns.keys()])
+    total = 0
+    with pq.ParquetWriter(destino, schema, compression="zstd") as escritor:
+        for colunas, lote in _lotes(stmt, tamanho_lote, motor):
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array(coluna, type=schema.field(nome).type) for nome, coluna in zip(colunas, zip(*lote))],
+                schema=schema,
+            ))
+            total += len(lote)
+    return total
+
+
+def exportar_relatorio(stmt, destino, formato: str = "csv", tamanho_lote: int = LINHAS_POR_LOTE,
+                       motor: str = "postgres") -> int:
+    # grava o relatório inteiro em `destino` (arquivo binário aberto) e retorna o número de linhas
+    if formato == "parquet":
+        return _exportar_parquet(stmt, destino, tamanho_lote, motor)
+    return _exportar_csv(stmt, destino, tamanho_lote, motor)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o relatório de vendas em streaming")
+    parser.add_argument("arquivo")
+    parser.add_argument("--inicio", type=date.fromisoformat)
+    parser.add_argument("--fim", type=date.fromisoformat)
+    parser.add_argument("--produto")
+    parser.add_argument("--fornecedor")
+    parser.add_argument("--agrupar", choices=[a for a in AGRUPAMENTOS if a])
+    parser.add_argument("--formato", choices=["csv", "parquet"])
+    parser.add_argument("--motor", choices=list(MOTORES), default="postgres")
+    args = parser.parse_args()
+
+    formato = args.formato or ("parquet" if args.arquivo.lower().endswith(".parquet") else "csv")
+    with open(args.arquivo, "wb") as destino:
+        total = exportar_relatorio(consulta_relatorio(args.produto, args.fornecedor, args.inicio, args.fim, args.agrupar),
+                                   destino, formato, motor=args.motor)
+    print(f"{total} linha(s) exportada(s) para {args.arquivo}.")
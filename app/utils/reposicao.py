@@ -0,0 +1,68 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.models import Produto, Fornecedor, Pedido, DemandaProduto
+from utils.cache import cache_leitura, CACHE_TTL_VENDAS
+from utils.demanda import colunas_demanda
+
+PRAZO_PADRAO_DIAS = 7
+
+
+@cache_leitura("vendas", "produtos", "pedidos", "fornecedores", ttl=CACHE_TTL_VENDAS)
+def planejar_reposicao(db: Session, dias_cobertura: int = 30, nivel_servico: float = 0.95) -> pd.DataFrame:
+    # plano de compra de todos os SKUs em uma consulta + aritmética vetorizada. Média e desvio diários vêm do
+    # estado EWMA de utils/demanda.py (uma linha por produto, sem varrer o histórico de vendas):
+    #   estoque de segurança = z * desvio diário * sqrt(prazo)
+    #   ponto de pedido      = média diária * prazo + estoque de segurança
+    #   alvo                 = média diária * (prazo + cobertura) + estoque de segurança
+    #   sugestão             = alvo - (estoque atual + quantidade já pendente em pedidos)
+    media_demanda, desvio_demanda = colunas_demanda()
+    em_pedido = select(
+        Pedido.produto_id, func.sum(Pedido.quantidade).label("quantidade")
+    ).where(Pedido.status == "pendente").group_by(Pedido.produto_id).subquery()
+
+    linhas = db.execute(
+        select(
+            Produto.id, Produto.nome, Produto.estoque_atual, Produto.fornecedor_id, Fornecedor.nome,
+            func.coalesce(Fornecedor.prazo_entrega_dias, PRAZO_PADRAO_DIAS),
+            func.coalesce(media_demanda, 0.0), func.coalesce(desvio_demanda, 0.0),
+            func.coalesce(em_pedido.c.quantidade, 0),
+        )
+        .outerjoin(Fornecedor, Produto.fornecedor_id == Fornecedor.id)
+        .outerjoin(DemandaProduto, DemandaProduto.produto_id == Produto.id)
+        .outerjoin(em_pedido, em_pedido.c.produto_id == Produto.id)
+    ).all()
+
+    plano = pd.DataFrame(linhas, columns=[
+        "produto_id", "produto", "estoque_atual", "fornecedor_id", "fornecedor",
+        "prazo_entrega_dias", "media", "desvio", "em_pedido",
+    ])
+    media = plano["media"].to_numpy(dtype=np.float64)
+    desvio = plano["desvio"].to_numpy(dtype=np.float64)
+    estoque = plano["estoque_atual"].fillna(0).to_numpy(dtype=np.float64)
+    pendente = plano["em_pedido"].to_numpy(dtype=np.float64)
+    prazo = plano["prazo_entrega_dias"].to_numpy(dtype=np.float64)
+
+    seguranca = NormalDist().inv_cdf(nivel_servico) * desvio * np.sqrt(prazo)
+    posicao = estoque + pendente
+
+    plano["demanda_media"] = media.round(2)
+    plano["demanda_desvio"] = desvio.round(2)
+    plano["estoque_seguranca"] = np.ceil(seguranca).astype(int)
+    plano["ponto_pedido"] = np.ceil(media * prazo + seguranca).astype(int)
+    plano["quantidade_sugerida"] = np.ceil(np.maximum(0.0, media * (prazo + dias_cobertura) + seguranca - posicao)).astype(int)
+    # sem demanda não há ponto de pedido: SKU parado com estoque zero não é reposição urgente
+    plano["abaixo_ponto_pedido"] = (media > 0) & (posicao <= media * prazo + seguranca)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plano["cobertura_dias"] = np.where(media > 0, posicao / media, np.inf).round(1)
+
+    # mais urgente primeiro: abaixo do ponto de pedido, depois menor cobertura
+    plano = plano.drop(columns=["media", "desvio"]).sort_values(
+        ["abaixo_ponto_pedido", "cobertura_dias", "quantidade_sugerida"], ascending=[False, True, False], kind="stable"
+    ).reset_index(drop=True)
+    plano["prioridade"] = np.arange(1, len(plano) + 1)
+    return plano
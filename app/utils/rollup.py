@@ -0,0 +1,33 @@
+import argparse
+from pathlib import Path
+
+from utils.db import engine
+
+SQL_DIR = Path(__file__).resolve().parent.parent / "sql"
+
+
+def backfill_vendas_diarias():
+    # a tabela e os triggers vêm da migração 0002; aqui só recalculamos o conteúdo
+    sql = (SQL_DIR / "vendas_diarias_backfill.sql").read_text(encoding="utf-8")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql(sql, execution_options={"no_parameters": True})
+
+
+def backfill_demanda():
+    # estado EWMA (migração 0007) reconstruído do rollup; necessário depois de mudar demanda_beta()
+    sql = (SQL_DIR / "demanda_produtos_backfill.sql").read_text(encoding="utf-8")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql(sql, execution_options={"no_parameters": True})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manutenção do rollup vendas_diarias e do estado de demanda")
+    parser.add_argument("comando", choices=["backfill", "backfill-demanda"])
+    args = parser.parse_args()
+
+    if args.comando == "backfill-demanda":
+        backfill_demanda()
+        print("demanda_produtos: backfill concluído.")
+    else:
+        backfill_vendas_diarias()
+        print(f"vendas_diarias: {args.comando} concluído.")
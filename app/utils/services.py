@@ -1,140 +1,357 @@
 import streamlit as st
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-import pandas as pd
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import delete, func, insert, text
 from datetime import date, timedelta
-import matplotlib.pyplot as plt
 
 from utils.db import SessionLocal, engine, Base
 from models.models import Produto, Venda, Pedido, Fornecedor, Usuario
 from utils.utils import normalizar_cnpj, validar_cnpj, normalizar_email, validar_email, validar_telefone
+from utils.cache import cache_leitura, invalidar, CACHE_TTL_VENDAS
+from utils.estoque import CRIAR_PRODUTOS, movimentar
+from utils.demanda import demanda_atual
 from passlib.context import CryptContext
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-Base.metadata.create_all(bind=engine)
+TAMANHO_PAGINA = 50
+
+def _paginar(query, coluna_id, apos_id, limite):
+    # paginação por cursor: WHERE id > último id visto, sem OFFSET
+    if apos_id is not None:
+        query = query.filter(coluna_id > apos_id)
+    itens = query.order_by(coluna_id).limit(limite + 1).all()
+    proximo = itens[limite - 1].id if len(itens) > limite else None
+    return itens[:limite], proximo
 
 #CRUD de produto
+@cache_leitura("produtos")
 def get_produtos(db: Session):
     return db.query(Produto).all()
 
-def criar_produto(db: Session, nome: str, estoque: int, preco: float):
-    produto = Produto(nome=nome, estoque_atual=estoque, preco=preco)
-    db.add(produto)
-    db.commit()
-    db.refresh(produto)
-    return produto
-
-def atualizar_produto(db: Session, produto_id: int, nome: str, estoque: int, preco: float):
-    produto = db.query(Produto).filter(Produto.id == produto_id).first()
-    if produto:
-        produto.nome = nome
-        produto.estoque_atual = estoque
-        produto.preco = preco
+@cache_leitura("produtos")
+def listar_produtos(db: Session, apos_id=None, limite=TAMANHO_PAGINA, prefixo_nome=None, fornecedor_id=None):
+    query = db.query(Produto)
+    if prefixo_nome:
+        query = query.filter(Produto.nome.startswith(prefixo_nome, autoescape=True))
+    if fornecedor_id is not None:
+        query = query.filter(Produto.fornecedor_id == fornecedor_id)
+    return _paginar(query, Produto.id, apos_id, limite)
+
+# Escritas: um único INSERT/UPDATE/DELETE ... RETURNING por chamada, sem SELECT prévio nem refresh.
+# Cada função aceita um registro ou uma lista (registros ou ids): a lista inteira vai num só statement,
+# via unnest de arrays, e o retorno é a lista de linhas gravadas (Row, com acesso por atributo).
+
+def _em_lote(valor, **campos):
+    # (registros, veio_lista): um registro avulso vira lista de um
+    if isinstance(valor, (list, tuple)):
+        return [dict(r) for r in valor], True
+    return [campos], False
+
+def _ids(valor):
+    return sorted({int(v) for v in valor}) if isinstance(valor, (list, tuple, set)) else [int(valor)]
+
+def _executar_escrita(db: Session, stmt, parametros=None):
+    try:
+        linhas = db.execute(stmt, parametros).all() if parametros is not None else db.execute(stmt).all()
         db.commit()
-        db.refresh(produto)
-        return produto
-    else:
-        raise ValueError("Produto não encontrado.")
+    except Exception:
+        db.rollback()
+        raise
+    return linhas
+
+# trava em ordem de id com a mesma ordem e o mesmo modo de utils/estoque.travar_produtos e atualiza nome e
+# preço; o saldo muda depois, via movimentar, e estoque_atual já volta com o valor pedido.
+# Linhas cujo estoque atual difere de `esperado` ficam de fora
+ATUALIZAR_PRODUTOS = text("""
+    WITH v AS (
+        SELECT * FROM unnest(CAST(:ids AS INT[]), CAST(:nomes AS TEXT[]), CAST(:estoques AS INT[]),
+                             CAST(:precos AS NUMERIC[]), CAST(:esperados AS INT[]))
+            AS v(id, nome, estoque, preco, esperado)
+    ), anterior AS MATERIALIZED (
+        SELECT p.id, p.estoque_atual FROM produtos p JOIN v ON v.id = p.id ORDER BY p.id FOR NO KEY UPDATE OF p
+    )
+    UPDATE produtos p SET nome = COALESCE(v.nome, p.nome), preco = COALESCE(v.preco, p.preco)
+    FROM v JOIN anterior a ON a.id = v.id
+    WHERE p.id = v.id AND (v.esperado IS NULL OR a.estoque_atual = v.esperado)
+    RETURNING p.id, p.nome, COALESCE(v.estoque, a.estoque_atual) AS estoque_atual, p.preco, p.fornecedor_id,
+        COALESCE(v.estoque, a.estoque_atual) - a.estoque_atual AS delta
+""")
 
-def deletar_produto(db: Session, produto_id: int):
-    produto = db.query(Produto).filter(Produto.id == produto_id).first()
-    if produto:
-        db.delete(produto)
+def criar_produto(db: Session, nome, estoque: int = 0, preco: float = None, fornecedor_id: int = None):
+    # nome pode ser uma lista de registros {nome, estoque, preco[, fornecedor_id]}.
+    # O estoque inicial entra no livro de movimentos como saldo_inicial, no mesmo statement
+    registros, lote = _em_lote(nome, nome=nome, estoque=estoque, preco=preco, fornecedor_id=fornecedor_id)
+    linhas = _executar_escrita(db, CRIAR_PRODUTOS, {
+        "nomes": [r["nome"] for r in registros],
+        "estoques": [int(r.get("estoque") or 0) for r in registros],
+        "precos": [r["preco"] for r in registros],
+        "fornecedores": [r.get("fornecedor_id") for r in registros],
+    })
+    invalidar("produtos")
+    return linhas if lote else linhas[0]
+
+def atualizar_produto(db: Session, produto_id, nome: str = None, estoque: int = None, preco: float = None,
+                      estoque_esperado=None):
+    # produto_id pode ser uma lista de registros {id, nome, estoque, preco[, estoque_esperado]}; campos None
+    # ficam como estão. O saldo não é sobrescrito às cegas: a diferença vira um movimento de ajuste, e com
+    # estoque_esperado (o saldo que o usuário viu) a alteração é recusada se outra operação mexeu no estoque antes
+    registros, lote = _em_lote(produto_id, id=produto_id, nome=nome, estoque=estoque, preco=preco,
+                               estoque_esperado=estoque_esperado)
+    registros = list({int(r["id"]): r for r in registros}.values())
+    try:
+        linhas = db.execute(ATUALIZAR_PRODUTOS, {
+            "ids": [int(r["id"]) for r in registros],
+            "nomes": [r.get("nome") for r in registros],
+            "estoques": [r.get("estoque") for r in registros],
+            "precos": [r.get("preco") for r in registros],
+            "esperados": [r.get("estoque_esperado") for r in registros],
+        }).all()
+        movimentar(db, [(linha.id, linha.delta) for linha in linhas], "ajuste", travados=True)
         db.commit()
-    else:
+    except Exception:
+        db.rollback()
+        raise
+    if linhas:
+        invalidar("produtos")
+    if lote:
+        return linhas
+    if not linhas:
+        atual = db.query(Produto.estoque_atual).filter(Produto.id == produto_id).scalar()
+        db.rollback()
+        if atual is None:
+            raise ValueError("Produto não encontrado.")
+        raise ValueError(f"O estoque foi alterado por outra operação (agora {atual}). Recarregue e tente de novo.")
+    return linhas[0]
+
+def deletar_produto(db: Session, produto_id):
+    # produto_id pode ser uma lista; vendas, pedidos e movimentos saem em cascata no banco
+    ids = _ids(produto_id)
+    removidos = [linha.id for linha in _executar_escrita(
+        db, delete(Produto.__table__).where(Produto.id.in_(ids)).returning(Produto.id))]
+    if not removidos:
         raise ValueError("Produto não encontrado.")
+    invalidar("produtos", "pedidos", "vendas")
+    return removidos
 
-# CRUD Fornecedor (sem alterações)
+# CRUD Fornecedor
+@cache_leitura("fornecedores")
 def get_fornecedores(db: Session):
     return db.query(Fornecedor).all()
 
-def criar_fornecedor(db: Session, nome, cnpj, email, telefone, segmento):
+@cache_leitura("fornecedores")
+def listar_fornecedores(db: Session, apos_id=None, limite=TAMANHO_PAGINA, prefixo_nome=None, segmento=None):
+    query = db.query(Fornecedor)
+    if prefixo_nome:
+        query = query.filter(Fornecedor.nome.startswith(prefixo_nome, autoescape=True))
+    if segmento:
+        query = query.filter(Fornecedor.segmento == segmento)
+    return _paginar(query, Fornecedor.id, apos_id, limite)
+
+def _validar_fornecedor(registro: dict) -> dict:
     #validação sem rejects
-    if not validar_cnpj(cnpj):
+    if not validar_cnpj(registro["cnpj"]):
         raise ValueError("CNPJ inválido") 
-    if email and not validar_email(email):
+    if registro.get("email") and not validar_email(registro["email"]):
         raise ValueError("Email inválido")
-    if telefone and not validar_telefone(telefone):
+    if registro.get("telefone") and not validar_telefone(registro["telefone"]):
         raise ValueError("Telefone inválido")
+    return {**registro, "cnpj": normalizar_cnpj(registro["cnpj"]), "email": normalizar_email(registro.get("email"))}
 
-    fornecedor = Fornecedor(nome=nome, cnpj=normalizar_cnpj(cnpj), email=normalizar_email(email), telefone=telefone, segmento=segmento)
-    db.add(fornecedor)
-    db.commit()
-    db.refresh(fornecedor)
-    return fornecedor
+ATUALIZAR_FORNECEDORES = text("""
+    UPDATE fornecedores f
+    SET nome = v.nome, cnpj = v.cnpj, email = v.email, telefone = v.telefone, segmento = v.segmento
+    FROM unnest(CAST(:ids AS INT[]), CAST(:nomes AS TEXT[]), CAST(:cnpjs AS TEXT[]), CAST(:emails AS TEXT[]),
+                CAST(:telefones AS TEXT[]), CAST(:segmentos AS TEXT[]))
+        AS v(id, nome, cnpj, email, telefone, segmento)
+    WHERE f.id = v.id
+    RETURNING f.*
+""")
 
-def atualizar_fornecedor(db: Session, fornecedor_id, nome, cnpj, email, telefone, segmento):
-        #validação sem rejects
-    if not validar_cnpj(cnpj):
-        raise ValueError("CNPJ inválido") 
-    if email and not validar_email(email):
-        raise ValueError("Email inválido")
-    if telefone and not validar_telefone(telefone):
-        raise ValueError("Telefone inválido")
-    fornecedor = db.query(Fornecedor).filter(Fornecedor.id == fornecedor_id).first()
-    if fornecedor:
-        fornecedor.nome = nome
-        fornecedor.cnpj = normalizar_cnpj(cnpj)
-        fornecedor.email = normalizar_email(email)
-        fornecedor.telefone = telefone
-        fornecedor.segmento = segmento
-        db.commit()
-        db.refresh(fornecedor)
-    return fornecedor
+# produtos do fornecedor ficam sem fornecedor (como fazia o ORM) no mesmo statement do DELETE
+DELETAR_FORNECEDORES = text("""
+    WITH soltos AS (
+        UPDATE produtos SET fornecedor_id = NULL WHERE fornecedor_id = ANY(CAST(:ids AS INT[]))
+    )
+    DELETE FROM fornecedores WHERE id = ANY(CAST(:ids AS INT[])) RETURNING id
+""")
+
+def criar_fornecedor(db: Session, nome, cnpj=None, email=None, telefone=None, segmento=None):
+    # nome pode ser uma lista de registros {nome, cnpj, email, telefone, segmento}
+    registros, lote = _em_lote(nome, nome=nome, cnpj=cnpj, email=email, telefone=telefone, segmento=segmento)
+    registros = [_validar_fornecedor(r) for r in registros]
+    linhas = _executar_escrita(db, insert(Fornecedor.__table__).values([
+        {c: r.get(c) for c in ("nome", "cnpj", "email", "telefone", "segmento")} for r in registros
+    ]).returning(*Fornecedor.__table__.c))
+    invalidar("fornecedores")
+    return linhas if lote else linhas[0]
+
+def atualizar_fornecedor(db: Session, fornecedor_id, nome=None, cnpj=None, email=None, telefone=None, segmento=None):
+    # fornecedor_id pode ser uma lista de registros {id, nome, cnpj, email, telefone, segmento}
+    registros, lote = _em_lote(fornecedor_id, id=fornecedor_id, nome=nome, cnpj=cnpj, email=email, telefone=telefone,
+                               segmento=segmento)
+    registros = [_validar_fornecedor(r) for r in registros]
+    linhas = _executar_escrita(db, ATUALIZAR_FORNECEDORES, {
+        "ids": [int(r["id"]) for r in registros],
+        **{f"{c}s": [r.get(c) for r in registros] for c in ("nome", "cnpj", "email", "telefone", "segmento")},
+    })
+    if linhas:
+        invalidar("fornecedores")
+    return linhas if lote else next(iter(linhas), None)
 
 def deletar_fornecedor(db: Session, fornecedor_id):
-    fornecedor = db.query(Fornecedor).filter(Fornecedor.id == fornecedor_id).first()
-    if fornecedor:
-        db.delete(fornecedor)
-        db.commit()
-        return True
-    return False
+    # fornecedor_id pode ser uma lista; retorna os ids removidos (vazio se nenhum existia)
+    removidos = [linha.id for linha in _executar_escrita(db, DELETAR_FORNECEDORES, {"ids": _ids(fornecedor_id)})]
+    if removidos:
+        invalidar("fornecedores", "produtos")
+    return removidos
 
 # CRUD Produto, Venda e Pedido
+@cache_leitura("pedidos", "produtos", "fornecedores")
 def get_pedidos(db: Session):
-    return db.query(Pedido).all()
+    # relações carregadas junto: o resultado sai da sessão ao entrar no cache
+    return db.query(Pedido).options(joinedload(Pedido.produto), joinedload(Pedido.fornecedor)).all()
 
+@cache_leitura("pedidos", "produtos", "fornecedores")
+def listar_pedidos(db: Session, apos_id=None, limite=TAMANHO_PAGINA, status=None, data_ini=None, data_fim=None,
+                   fornecedor_id=None, produto_id=None):
+    # linhas planas com os nomes vindos de join: uma consulta por página, sem carregar relações
+    query = db.query(
+        Pedido.id,
+        Produto.nome.label("produto"),
+        Fornecedor.nome.label("fornecedor"),
+        Pedido.quantidade,
+        Pedido.status,
+        Pedido.data_pedido,
+    ).outerjoin(Produto, Pedido.produto_id == Produto.id).outerjoin(Fornecedor, Pedido.fornecedor_id == Fornecedor.id)
+    if status:
+        query = query.filter(Pedido.status == status)
+    if data_ini:
+        query = query.filter(Pedido.data_pedido >= data_ini)
+    if data_fim:
+        query = query.filter(Pedido.data_pedido <= data_fim)
+    if fornecedor_id is not None:
+        query = query.filter(Pedido.fornecedor_id == fornecedor_id)
+    if produto_id is not None:
+        query = query.filter(Pedido.produto_id == produto_id)
+    return _paginar(query, Pedido.id, apos_id, limite)
+
+@cache_leitura("pedidos")
+def contar_pedidos_por_status(db: Session):
+    return dict(db.query(Pedido.status, func.count(Pedido.id)).group_by(Pedido.status).all())
+
+@cache_leitura("vendas", ttl=CACHE_TTL_VENDAS)
 def get_vendas_ultimos_30_dias(db: Session):
     data_limite = date.today() - timedelta(days=30)
     return db.query(Venda).filter(Venda.data_venda >= data_limite).all()
 
 def calcular_media_vendas(db: Session, produto_id: int):
-    data_limite = date.today() - timedelta(days=30)
-    soma_vendas = db.query(func.sum(Venda.quantidade)).filter(
-        Venda.produto_id == produto_id,
-        Venda.data_venda >= data_limite
-    ).scalar() or 0
-    return soma_vendas / 30  # média diária
-
-def criar_pedido(db: Session, produto_id: int, fornecedor_id: int, quantidade: int):
-    pedido = Pedido(
-        produto_id=produto_id, 
-        fornecedor_id=fornecedor_id, 
-        quantidade=quantidade, 
-        status='pendente', 
-        data_pedido=date.today()
+    # média diária ponderada (EWMA) lida do estado de demanda do produto: uma linha, sem varrer as vendas
+    return demanda_atual(db, [produto_id]).get(produto_id, {}).get("media_diaria", 0.0)
+
+# trava os pedidos em ordem de id e devolve, junto com a linha, o efeito no estoque da mudança:
+# pedido "enviado" é mercadoria recebida e conta no estoque enquanto estiver nesse status
+ATUALIZAR_PEDIDOS = text("""
+    WITH v AS (
+        SELECT * FROM unnest(CAST(:ids AS INT[]), CAST(:quantidades AS INT[]), CAST(:status AS TEXT[]))
+            AS v(id, quantidade, status)
+    ), anterior AS MATERIALIZED (
+        SELECT p.id, p.quantidade, p.status FROM pedidos p JOIN v ON v.id = p.id ORDER BY p.id FOR UPDATE OF p
     )
-    db.add(pedido)
-    db.commit()
-    db.refresh(pedido)
-    return pedido
-
-def atualizar_pedido(db: Session, pedido_id: int, quantidade: int, status: str):
-    pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
-    if pedido:
-        pedido.quantidade = quantidade
-        pedido.status = status
+    UPDATE pedidos p SET quantidade = COALESCE(v.quantidade, p.quantidade), status = COALESCE(v.status, p.status)
+    FROM v JOIN anterior a ON a.id = v.id
+    WHERE p.id = v.id
+    RETURNING p.id, p.produto_id, p.fornecedor_id, p.quantidade, p.status, p.data_pedido,
+        (CASE WHEN p.status = 'enviado' THEN p.quantidade ELSE 0 END)
+        - (CASE WHEN a.status = 'enviado' THEN a.quantidade ELSE 0 END) AS delta
+""")
+
+def criar_pedido(db: Session, produto_id, fornecedor_id: int = None, quantidade: int = None):
+    # produto_id pode ser uma lista de registros {produto_id, fornecedor_id, quantidade}
+    registros, lote = _em_lote(produto_id, produto_id=produto_id, fornecedor_id=fornecedor_id, quantidade=quantidade)
+    linhas = _executar_escrita(db, insert(Pedido.__table__).values([{
+        "produto_id": r["produto_id"], "fornecedor_id": r["fornecedor_id"], "quantidade": r["quantidade"],
+        "status": "pendente", "data_pedido": date.today(),
+    } for r in registros]).returning(*Pedido.__table__.c))
+    invalidar("pedidos")
+    return linhas if lote else linhas[0]
+
+# o fornecedor de cada pedido vem de produtos.fornecedor_id no próprio INSERT; produtos sem fornecedor ficam de fora
+CRIAR_PEDIDOS_SUGERIDOS = text("""
+    INSERT INTO pedidos (produto_id, fornecedor_id, quantidade, status, data_pedido)
+    SELECT p.id, p.fornecedor_id, v.quantidade, 'pendente', :hoje
+    FROM unnest(CAST(:ids AS INT[]), CAST(:quantidades AS INT[])) AS v(produto_id, quantidade)
+    JOIN produtos p ON p.id = v.produto_id
+    WHERE v.quantidade > 0 AND p.fornecedor_id IS NOT NULL
+    ORDER BY p.fornecedor_id, p.id
+    RETURNING id, fornecedor_id
+""")
+
+def criar_pedidos_em_lote(db: Session, sugestoes) -> dict:
+    # sugestoes: pares (produto_id, quantidade), p.ex. as colunas produto_id e quantidade_sugerida do plano de
+    # reposição. Um INSERT de várias linhas, numa transação; retorna {fornecedor_id: [ids dos pedidos criados]}
+    quantidades = {}
+    for produto_id, quantidade in sugestoes:
+        quantidades[int(produto_id)] = quantidades.get(int(produto_id), 0) + int(quantidade)
+    if not quantidades:
+        return {}
+    criados = {}
+    for linha in _executar_escrita(db, CRIAR_PEDIDOS_SUGERIDOS, {
+        "ids": list(quantidades), "quantidades": list(quantidades.values()), "hoje": date.today(),
+    }):
+        criados.setdefault(linha.fornecedor_id, []).append(linha.id)
+    if criados:
+        invalidar("pedidos")
+    return criados
+
+def atualizar_pedido(db: Session, pedido_id, quantidade: int = None, status: str = None):
+    # pedido_id pode ser uma lista de registros {id, quantidade, status}. O pedido é travado antes dos produtos
+    # (sempre nessa ordem), então dois cliques simultâneos não recebem a mesma mercadoria duas vezes
+    registros, lote = _em_lote(pedido_id, id=pedido_id, quantidade=quantidade, status=status)
+    registros = list({int(r["id"]): r for r in registros}.values())
+    try:
+        linhas = db.execute(ATUALIZAR_PEDIDOS, {
+            "ids": [int(r["id"]) for r in registros],
+            "quantidades": [r.get("quantidade") for r in registros],
+            "status": [r.get("status") for r in registros],
+        }).all()
+        movimentos = [linha for linha in linhas if linha.delta and linha.produto_id]
+        for tipo, sinal in (("recebimento", 1), ("estorno", -1)):
+            movimentar(db, [(linha.produto_id, linha.delta, linha.id)
+                            for linha in movimentos if linha.delta * sinal > 0], tipo)
         db.commit()
-        db.refresh(pedido)
-    return pedido
+    except Exception:
+        db.rollback()
+        raise
+    invalidar("pedidos")
+    if movimentos:
+        invalidar("produtos")
+    return linhas if lote else next(iter(linhas), None)
+
+# trava os pedidos em ordem de id, como ATUALIZAR_PEDIDOS, e devolve o que cada um somava ao estoque
+DELETAR_PEDIDOS = text("""
+    WITH alvo AS MATERIALIZED (
+        SELECT id FROM pedidos WHERE id = ANY(CAST(:ids AS INT[])) ORDER BY id FOR UPDATE
+    )
+    DELETE FROM pedidos p USING alvo WHERE p.id = alvo.id
+    RETURNING p.id, p.produto_id, CASE WHEN p.status = 'enviado' THEN p.quantidade ELSE 0 END AS recebido
+""")
 
-def deletar_pedido(db: Session, pedido_id: int):
-    pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
-    if pedido:
-        db.delete(pedido)
+def deletar_pedido(db: Session, pedido_id):
+    # pedido_id pode ser uma lista; retorna os ids removidos (vazio se nenhum existia).
+    # Pedido "enviado" já entrou no estoque: a remoção estorna a quantidade na mesma transação
+    try:
+        linhas = db.execute(DELETAR_PEDIDOS, {"ids": _ids(pedido_id)}).all()
+        estornos = [(linha.produto_id, -linha.recebido, linha.id)
+                    for linha in linhas if linha.recebido and linha.produto_id]
+        movimentar(db, estornos, "estorno")
         db.commit()
-        return True
-    return False
+    except Exception:
+        db.rollback()
+        raise
+    if linhas:
+        invalidar("pedidos")
+    if estornos:
+        invalidar("produtos")
+    return [linha.id for linha in linhas]
 
 #CRUD  de login
 def login_tela():
@@ -1,8 +1,8 @@
-def styles(img_base64: str) -> str:
+def styles(url_fundo: str) -> str:
     return f"""
     <style>
     .stApp {{
-        background-image: linear-gradient(rgba(255, 255, 255, 0.6), rgba(255, 255, 255, 0.6)), url("{img_base64}");
+        background-image: linear-gradient(rgba(255, 255, 255, 0.6), rgba(255, 255, 255, 0.6)), url("{url_fundo}");
         background-size: cover;
         background-position: center;
         background-attachment: fixed;
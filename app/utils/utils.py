@@ -87,4 +87,45 @@ def validar_quantidade(qtd: int | float) -> tuple[bool, str | None]:
 def get_base64_image(image_path):
     with open(image_path, "rb") as image_file:
         encoded = base64.b64encode(image_file.read()).decode()
-    return f"data:image/jpeg;base64,{encoded}"
\ No newline at end of file
+    return f"data:image/jpeg;base64,{encoded}"
+
+# Validações vetorizadas (colunas pandas inteiras) usadas na importação em massa
+
+PESOS_CNPJ_DV1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+PESOS_CNPJ_DV2 = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+
+def normalizar_cnpj_serie(cnpjs):
+    # [^0-9] e não \D: \d também casa dígitos não ASCII ('١'), que quebrariam o encode em validar_cnpj_serie
+    return cnpjs.fillna("").astype(str).str.replace(r"[^0-9]", "", regex=True)
+
+def validar_cnpj_serie(cnpjs):
+    # espera CNPJs já normalizados; confere tamanho e os dois dígitos verificadores
+    import numpy as np
+
+    validos = cnpjs.str.fullmatch(r"[0-9]{14}").fillna(False).astype(bool)
+    candidatos = cnpjs[validos]
+    if candidatos.empty:
+        return validos
+
+    digitos = np.frombuffer("".join(candidatos).encode("ascii"), dtype=np.uint8).reshape(-1, 14).astype(np.int64) - 48
+    resto1 = digitos[:, :12] @ np.array(PESOS_CNPJ_DV1) % 11
+    resto2 = digitos[:, :13] @ np.array(PESOS_CNPJ_DV2) % 11
+    dv1 = np.where(resto1 < 2, 0, 11 - resto1)
+    dv2 = np.where(resto2 < 2, 0, 11 - resto2)
+    repetidos = (digitos == digitos[:, :1]).all(axis=1)
+
+    validos.loc[candidatos.index] = (dv1 == digitos[:, 12]) & (dv2 == digitos[:, 13]) & ~repetidos
+    return validos
+
+def normalizar_email_serie(emails):
+    return emails.str.strip().str.lower()
+
+def validar_email_serie(emails):
+    return emails.fillna("").str.match(r"^[\w\.-]+@[\w\.-]+\.\w+$")
+
+def validar_telefone_serie(telefones):
+    digitos = telefones.fillna("").str.replace(r"\D", "", regex=True)
+    return digitos.str.len().between(8, 20)
+
+def validar_nome_serie(nomes):
+    return nomes.fillna("").str.strip().str.fullmatch(r"[A-Za-zÀ-ÿ\s]{2,100}")
@@ -2,12 +2,8 @@ from datetime import date, timedelta
 import base64
 
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
 from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from utils.db import SessionLocal, engine, Base
@@ -15,12 +11,15 @@ from models.models import *
 from utils.auth import *
 from utils.services import *
 from utils.utils import *
+from utils.relatorios import AGRUPAMENTOS, LINHAS_PREVIA, MOTORES, SEM_FORNECEDOR, consulta_relatorio, previa_relatorio, exportar_relatorio
+from utils.espelho import espelho_disponivel, ler_marcas
+from utils.demanda import demanda_atual
 from utils.view import *
 
 from utils.services import *
 
-
-sns.set_theme(style="whitegrid")
+# pandas, plotly e os módulos de análise (NumPy) são importados dentro das páginas que os usam:
+# login e Home não pagam pelo carregamento deles. bench/tempo_importacao.py verifica isso.
 
 
 def home():
@@ -54,23 +53,78 @@ def home():
         st.session_state.usuario = None
         st.rerun()
 
+def _cursor_pagina(chave, filtros):
+    # pilha de cursores por listagem; trocar os filtros volta para a primeira página
+    estado = st.session_state.setdefault(f"pagina_{chave}", {"filtros": None, "cursores": [None]})
+    if estado["filtros"] != filtros:
+        estado["filtros"] = filtros
+        estado["cursores"] = [None]
+    return estado["cursores"][-1]
+
+def _navegacao_pagina(chave, proximo):
+    cursores = st.session_state[f"pagina_{chave}"]["cursores"]
+    col1, col2, col3 = st.columns([1, 1, 4])
+    if col1.button("◀ Anterior", key=f"anterior_{chave}", disabled=len(cursores) == 1):
+        cursores.pop()
+        st.rerun()
+    if col2.button("Próxima ▶", key=f"proxima_{chave}", disabled=proximo is None):
+        cursores.append(proximo)
+        st.rerun()
+    col3.caption(f"Página {len(cursores)}")
+
+def _tabela_fornecedores(db, chave):
+    import pandas as pd
+
+    prefixo = st.text_input("Filtrar por nome (começa com)", key=f"filtro_{chave}").strip()
+    cursor = _cursor_pagina(chave, (prefixo,))
+    fornecedores, proximo = listar_fornecedores(db, apos_id=cursor, prefixo_nome=prefixo or None)
+    if fornecedores:
+        df_fornecedores = pd.DataFrame([{
+            "ID": f.id,
+            "Nome": f.nome,
+            "CNPJ": f.cnpj,
+            "Email": f.email,
+            "Telefone": f.telefone,
+            "Segmento": f.segmento
+        } for f in fornecedores])
+        st.dataframe(df_fornecedores, use_container_width=True)
+        _navegacao_pagina(chave, proximo)
+    else:
+        st.info("Nenhum fornecedor cadastrado." if not prefixo else "Nenhum fornecedor encontrado.")
+
 def exibir_pedidos(db):
+    import pandas as pd
+
     st.subheader("Lista de Pedidos")
-    pedidos = get_pedidos(db)
+
+    col1, col2, col3 = st.columns(3)
+    status_filtro = col1.selectbox("Status", ["Todos", "pendente", "enviado", "cancelado"], key="filtro_status_pedidos")
+    nomes_fornecedores = {f.id: f.nome for f in get_fornecedores(db)}
+    fornecedor_filtro = col2.selectbox("Fornecedor", [None] + list(nomes_fornecedores), key="filtro_fornecedor_pedidos",
+                                       format_func=lambda f: "Todos" if f is None else nomes_fornecedores[f])
+    periodo = col3.date_input("Período", value=(), key="filtro_periodo_pedidos")
+    data_ini, data_fim = (periodo + (None, None))[:2] if isinstance(periodo, tuple) else (periodo, periodo)
+
+    filtros = dict(
+        status=None if status_filtro == "Todos" else status_filtro,
+        data_ini=data_ini,
+        data_fim=data_fim,
+        fornecedor_id=fornecedor_filtro,
+    )
+    cursor = _cursor_pagina("pedidos", tuple(filtros.values()))
+    pedidos, proximo = listar_pedidos(db, apos_id=cursor, **filtros)
+
     if pedidos:
-        df = pd.DataFrame([{
-            "ID": ped.id,
-            "Produto": ped.produto.nome if ped.produto else "Não disponível",
-            "Fornecedor": ped.fornecedor.nome if ped.fornecedor else "Não disponível",
-            "Quantidade": ped.quantidade,
-            "Status": ped.status,
-            "Data do pedido": ped.data_pedido
-        } for ped in pedidos])
+        df = pd.DataFrame.from_records(pedidos, columns=["ID", "Produto", "Fornecedor", "Quantidade", "Status", "Data do pedido"])
+        df[["Produto", "Fornecedor"]] = df[["Produto", "Fornecedor"]].fillna("Não disponível")
         st.dataframe(df, use_container_width=True)
+        _navegacao_pagina("pedidos", proximo)
 
         st.markdown("Editar ou excluir pedido")
         pedido_id = st.number_input("Informe o ID do pedido", min_value=1, step=1)
-        pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
+        # linha que vai ser editada: lida no primário para o rerun após salvar não mostrar a versão da réplica
+        with db.ler_no_primario():
+            pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
         if pedido:
             quantidade = st.number_input("Quantidade", value=pedido.quantidade, min_value=1)
             status_options = ["pendente", "enviado", "cancelado"]
@@ -82,9 +136,13 @@ def exibir_pedidos(db):
                 if not valido:
                     st.error(f"Erro na quantidade: {erro}")
                 else:
-                    atualizar_pedido(db, pedido_id, int(quantidade), status)
-                    st.success("Pedido atualizado com sucesso.")
-                    st.rerun()
+                    try:
+                        atualizar_pedido(db, pedido_id, int(quantidade), status)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        st.success("Pedido atualizado com sucesso.")
+                        st.rerun()
 
             if st.button("Excluir pedido"):
                 deletar_pedido(db, pedido_id)
@@ -93,7 +151,7 @@ def exibir_pedidos(db):
         else:
             st.info("Pedido não encontrado.")
     else:
-        st.info("Não há pedidos registrados.")
+        st.info("Nenhum pedido encontrado.")
 
 def criar_pedido_view(db):
     st.subheader("Criar novo pedido")
@@ -115,9 +173,18 @@ def criar_pedido_view(db):
 
         quantidade = st.number_input("Quantidade", min_value=1, value=1)
 
-        media = calcular_media_vendas(db, produto_obj.id)
-        sugestao = max(1, int(media * 30 - produto_obj.estoque_atual))
+        from utils.reposicao import planejar_reposicao
+
+        plano = planejar_reposicao(db).set_index("produto_id")
+        item = plano.loc[produto_obj.id]
+        sugestao = max(1, int(item["quantidade_sugerida"]))
+        demanda = demanda_atual(db, [produto_obj.id]).get(produto_obj.id, {"media_diaria": 0.0, "desvio_diario": 0.0})
         st.write(f"Quantidade sugerida para repor estoque para 30 dias: {sugestao} unidades.")
+        st.caption(
+            f"Demanda diária (média ponderada): {demanda['media_diaria']:.2f} ± {demanda['desvio_diario']:.2f} · "
+            f"prazo de entrega: {item['prazo_entrega_dias']} dias · estoque de segurança: {item['estoque_seguranca']} · "
+            f"já pendente em pedidos: {item['em_pedido']}"
+        )
 
         if st.button("Criar pedido"):
             valido, erro = validar_quantidade(quantidade)
@@ -128,22 +195,34 @@ def criar_pedido_view(db):
                 st.success("Pedido criado com sucesso.")
                 st.rerun()
 
+        _pedidos_sugeridos(db, plano.reset_index())
+
+def _pedidos_sugeridos(db, plano):
+    # aceita a lista de "Quantidade Sugerida" do plano de reposição de uma vez: um pedido por produto, com o
+    # fornecedor do cadastro do produto, todos num único INSERT
+    st.markdown("### Pedidos sugeridos pelo plano de reposição")
+    sugeridos = plano[(plano["quantidade_sugerida"] > 0) & plano["fornecedor_id"].notna()]
+    if sugeridos.empty:
+        st.info("Nenhuma reposição sugerida para produtos com fornecedor cadastrado.")
+        return
+    tabela = st.data_editor(
+        sugeridos.assign(incluir=True)[["incluir", "produto_id", "produto", "fornecedor", "quantidade_sugerida",
+                                        "cobertura_dias"]].rename(columns={
+            "incluir": "Incluir", "produto_id": "ID", "produto": "Produto", "fornecedor": "Fornecedor",
+            "quantidade_sugerida": "Quantidade", "cobertura_dias": "Cobertura (dias)"}),
+        disabled=["ID", "Produto", "Fornecedor", "Cobertura (dias)"], hide_index=True, use_container_width=True,
+        key="pedidos_sugeridos",
+    )
+    selecionados = tabela[tabela["Incluir"] & (tabela["Quantidade"] > 0)]
+    if st.button(f"Criar {len(selecionados)} pedido(s) sugerido(s)", disabled=selecionados.empty):
+        criados = criar_pedidos_em_lote(db, zip(selecionados["ID"], selecionados["Quantidade"]))
+        st.success(f"{sum(map(len, criados.values()))} pedido(s) criado(s) para {len(criados)} fornecedor(es).")
+        st.rerun()
+
 def criar_fornecedores(db):
             st.subheader("Gestão de fornecedores")
 
-            fornecedores = get_fornecedores(db)
-            if fornecedores:
-                df_fornecedores = pd.DataFrame([{
-                    "ID": f.id,
-                    "Nome": f.nome,
-                    "CNPJ": f.cnpj,
-                    "Email": f.email,
-                    "Telefone": f.telefone,
-                    "Segmento": f.segmento
-                } for f in fornecedores])
-                st.dataframe(df_fornecedores, use_container_width=True)
-            else:
-                st.info("Nenhum fornecedor cadastrado.")
+            _tabela_fornecedores(db, "criar_fornecedores")
 
             with st.form("form_fornecedor"):
                 nome = st.text_input("Nome")
@@ -175,25 +254,17 @@ def criar_fornecedores(db):
                         st.success(f"Fornecedor '{nome}' criado com sucesso.")
                         st.rerun()
 
+            _importacao_em_massa(db, "fornecedores",
+                                 "Colunas: nome, cnpj, email, telefone, segmento. CNPJs já cadastrados são atualizados.")
+
 def fornecedores(db):
             st.subheader("Gestão de fornecedores")
 
-            fornecedores = get_fornecedores(db)
-            if fornecedores:
-                df_fornecedores = pd.DataFrame([{
-                    "ID": f.id,
-                    "Nome": f.nome,
-                    "CNPJ": f.cnpj,
-                    "Email": f.email,
-                    "Telefone": f.telefone,
-                    "Segmento": f.segmento
-                } for f in fornecedores])
-                st.dataframe(df_fornecedores, use_container_width=True)
-            else:
-                st.info("Nenhum fornecedor cadastrado.")
+            _tabela_fornecedores(db, "fornecedores")
 
             fornecedor_id = st.number_input("Informe o ID do fornecedor", min_value=1, step=1)
-            fornecedor = db.query(Fornecedor).filter(Fornecedor.id == fornecedor_id).first()
+            with db.ler_no_primario():
+                fornecedor = db.query(Fornecedor).filter(Fornecedor.id == fornecedor_id).first()
 
             if fornecedor:
                 nome_edit = st.text_input("Nome", value=fornecedor.nome, key="edit_nome")
@@ -235,9 +306,13 @@ def fornecedores(db):
                 st.info("Fornecedor não encontrado.")
 
 def produtos(db):
+            import pandas as pd
+
             st.subheader("Gestão de Produtos")
 
-            produtos = get_produtos(db)
+            prefixo = st.text_input("Filtrar por nome (começa com)", key="filtro_produtos").strip()
+            cursor = _cursor_pagina("produtos", (prefixo,))
+            produtos, proximo = listar_produtos(db, apos_id=cursor, prefixo_nome=prefixo or None)
             if produtos:
                 df_produtos = pd.DataFrame([{
                     "ID": p.id,
@@ -246,20 +321,32 @@ def produtos(db):
                     "Preço (R$)": float(p.preco)
                 } for p in produtos])
                 st.dataframe(df_produtos, use_container_width=True)
+                _navegacao_pagina("produtos", proximo)
             else:
-                st.info("Nenhum produto cadastrado.")
+                st.info("Nenhum produto cadastrado." if not prefixo else "Nenhum produto encontrado.")
 
             produto_id = st.number_input("Informe o ID do produto", min_value=1, step=1)
-            produto = db.query(Produto).filter(Produto.id == produto_id).first()
+            # no primário: um saldo atrasado da réplica viraria um estoque_esperado errado e o ajuste seria recusado
+            with db.ler_no_primario():
+                produto = db.query(Produto).filter(Produto.id == produto_id).first()
 
             if produto:
+                # saldo exibido no rerun anterior: se outra operação mexeu no estoque desde então, o ajuste é recusado
+                chave_visto = f"estoque_visto_{produto.id}"
+                estoque_visto = st.session_state.get(chave_visto, produto.estoque_atual)
+                st.session_state[chave_visto] = produto.estoque_atual
                 nome_edit = st.text_input("Nome", value=produto.nome, key="edit_nome_prod")
                 estoque_edit = st.number_input("Estoque", value=produto.estoque_atual, key="edit_estoque_prod")
                 preco_edit = st.number_input("Preço", value=float(produto.preco), format="%.2f", key="edit_preco_prod")                
                 if st.button("Atualizar produto"):
-                    atualizar_produto(db, produto_id, nome_edit, estoque_edit, preco_edit)
-                    st.success("Produto atualizado com sucesso.")
-                    st.rerun()
+                    try:
+                        atualizar_produto(db, produto_id, nome_edit, int(estoque_edit), preco_edit,
+                                          estoque_esperado=estoque_visto)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        st.success("Produto atualizado com sucesso.")
+                        st.rerun()
             
                 if st.button("Excluir produto"):
                     deletar_produto(db, produto_id)
@@ -282,7 +369,31 @@ def criar_produtos(db):
                     else:
                         criar_produto(db, nome_prod, estoque, preco)
                         st.success(f"Produto '{nome_prod}' adicionado com sucesso.")
-                        st.rerun()        
+                        st.rerun()
+
+            _importacao_em_massa(db, "produtos",
+                                 "Colunas: nome, estoque_atual, preco e, opcionalmente, fornecedor_cnpj ou fornecedor_id.")
+
+def _importacao_em_massa(db, tipo, ajuda):
+    with st.expander(f"Importação em massa de {tipo} (CSV)"):
+        st.caption(ajuda)
+        arquivo = st.file_uploader("Arquivo CSV", type=["csv"], key=f"upload_{tipo}")
+        if arquivo and st.button("Importar", key=f"importar_{tipo}"):
+            import pandas as pd
+            from utils import importacao
+
+            try:
+                resultado = getattr(importacao, f"importar_{tipo}")(db, pd.read_csv(arquivo, dtype=str, keep_default_na=False))
+            except SQLAlchemyError as e:
+                db.rollback()
+                st.error(f"O banco recusou a importação; nada foi gravado. Detalhe: {getattr(e, 'orig', e)}")
+                return
+            st.success(f"{resultado['gravados']} {tipo} gravados.")
+            if resultado["rejeitados"]:
+                st.warning(f"{resultado['rejeitados']} linhas rejeitadas.")
+                st.dataframe(resultado["erros"], use_container_width=True)
+                st.download_button("Baixar relatório de erros", resultado["erros"].to_csv(index=False),
+                                   file_name=f"erros_{tipo}.csv", mime="text/csv")
 
 def cadastrar_usuario():
             st.subheader("Novo Usuário")
@@ -345,30 +456,103 @@ def login_page():
                         st.warning("Usuário já existe.")
 
 
+def _filtros_relatorio():
+    estado = st.session_state
+    return dict(
+        produto=None if estado.get("dash_rel_produto", "Todos") == "Todos" else estado["dash_rel_produto"],
+        fornecedor=None if estado.get("dash_rel_fornecedor", "Todos") == "Todos" else estado["dash_rel_fornecedor"],
+        data_ini=estado.get("dash_rel_ini", date.today() - timedelta(days=30)),
+        data_fim=estado.get("dash_rel_fim", date.today()),
+        agrupamento=estado.get("dash_rel_agrupamento"),
+    )
+
+
+def _motor_relatorio():
+    # o espelho só entra como opção depois da primeira exportação (python -m utils.espelho atualizar)
+    motor = st.session_state.get("dash_rel_motor", "postgres")
+    return motor if motor == "postgres" or espelho_disponivel() else "postgres"
+
+
+def _exportacao_relatorio(filtros, motor):
+    # o arquivo é montado em disco lote a lote (cursor no servidor); só o arquivo final vai para o download
+    import tempfile
+
+    col1, col2 = st.columns(2)
+    formato = col1.radio("Formato", ["csv", "parquet"], horizontal=True, key="dash_rel_formato")
+    if col2.button("Gerar exportação completa"):
+        with tempfile.TemporaryFile() as arquivo:
+            with st.spinner("Exportando..."):
+                total = exportar_relatorio(consulta_relatorio(**filtros), arquivo, formato, motor=motor)
+            arquivo.seek(0)
+            st.download_button(f"Baixar {total} linha(s) em {formato.upper()}", arquivo,
+                               file_name=f"relatorio_vendas.{formato}",
+                               mime="text/csv" if formato == "csv" else "application/octet-stream")
+
+
+def _carregar_dashboard():
+    from utils.cubo import carregar_cubo_vendas
+    from utils.dashboard import carregar_em_paralelo
+    from utils.previsao import prever_demanda
+    from utils.reposicao import planejar_reposicao
+
+    # etapa de carga: as consultas independentes saem juntas, cada uma na sua conexão, antes de qualquer gráfico.
+    # Os valores dos widgets vêm do session_state (já atualizado no início do rerun), com os mesmos padrões dos widgets.
+    estado = st.session_state
+    relatorio, motor = consulta_relatorio(**_filtros_relatorio()), _motor_relatorio()
+    historico, horizonte = estado.get("dash_historico", 30), estado.get("dash_horizonte", 14)
+    return carregar_em_paralelo({
+        "cubo": lambda db: carregar_cubo_vendas(db, dias=30),
+        "plano": planejar_reposicao,
+        "demanda": demanda_atual,
+        "status": contar_pedidos_por_status,
+        "fornecedores": lambda db: sorted({f.nome for f in get_fornecedores(db)}),
+        "relatorio": lambda db: previa_relatorio(db, relatorio, motor=motor),
+        "previsao": lambda db: prever_demanda(db, dias_historico=historico, horizonte=horizonte),
+    })
+
+
 def exibir_dashboard(db):
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     st.subheader("Visão Geral dos Estoques e Recomendações de Pedido")
-    produtos = get_produtos(db)
+    dados, erros = _carregar_dashboard()
+    for nome, erro in erros.items():
+        st.warning(f"Não foi possível carregar '{nome}': {erro}")
 
-    if not produtos:
+    cubo = dados.get("cubo")
+    if cubo is None:
+        return
+    if not cubo.nomes:
         st.info("Não há produtos cadastrados.")
         return
 
-    df = pd.DataFrame([{
-        "Produto": p.nome,
-        "Estoque Atual": p.estoque_atual,
-        "Preço (R$)": float(p.preco),
-        "Média diária de vendas (últimos 30 dias)": round(calcular_media_vendas(db, p.id), 2)
-    } for p in produtos])
+    df = pd.DataFrame({
+        "Produto": cubo.nomes,
+        "Estoque Atual": cubo.estoques.astype(int),
+        "Preço (R$)": cubo.precos,
+        "Média diária de vendas (últimos 30 dias)": cubo.media_diaria().round(2),
+    })
+    demanda = dados.get("demanda")
+    if demanda is not None:
+        # tendência recente: a média ponderada dá mais peso aos últimos dias que a média simples de 30 dias
+        df["Demanda diária (média ponderada)"] = [
+            round(demanda.get(int(p), {}).get("media_diaria", 0.0), 2) for p in cubo.produto_ids
+        ]
 
     st.dataframe(df, use_container_width=True)
 
-    # Sugestão de pedidos
-    sugestoes = [
-        {"Produto": p.nome, "Quantidade Sugerida": max(0, int(calcular_media_vendas(db, p.id) * 30 - p.estoque_atual))}
-        for p in produtos
-    ]
-    df_sugestoes = pd.DataFrame(sugestoes)
-    st.dataframe(df_sugestoes, use_container_width=True)
+    # Sugestão de pedidos: plano de reposição com prazo de entrega, estoque de segurança e pedidos pendentes
+    plano = dados.get("plano")
+    if plano is not None:
+        df_sugestoes = plano.rename(columns={
+            "prioridade": "Prioridade", "produto": "Produto", "fornecedor": "Fornecedor", "em_pedido": "Em pedido",
+            "estoque_seguranca": "Estoque de segurança", "ponto_pedido": "Ponto de pedido",
+            "cobertura_dias": "Cobertura (dias)", "quantidade_sugerida": "Quantidade Sugerida",
+        })[["Prioridade", "Produto", "Fornecedor", "Em pedido", "Estoque de segurança", "Ponto de pedido",
+            "Cobertura (dias)", "Quantidade Sugerida"]]
+        st.dataframe(df_sugestoes, use_container_width=True, hide_index=True)
 
     # Estoque Atual com Plotly
     st.markdown("### Estoque Atual por Produto")
@@ -377,13 +561,10 @@ def exibir_dashboard(db):
 
     # Vendas Diárias (Últimos 30 dias)
     st.markdown("### Vendas Diárias nos Últimos 30 Dias")
-    data_limite = date.today() - timedelta(days=30)
-    vendas_30d = db.query(Venda.data_venda, func.sum(Venda.quantidade)).filter(
-        Venda.data_venda >= data_limite
-    ).group_by(Venda.data_venda).order_by(Venda.data_venda).all()
+    totais_diarios = cubo.totais_diarios()
 
-    if vendas_30d:
-        df_vendas = pd.DataFrame(vendas_30d, columns=["Data", "Quantidade"])
+    if totais_diarios.any():
+        df_vendas = pd.DataFrame({"Data": cubo.datas, "Quantidade": totais_diarios})
         fig_vendas = px.line(df_vendas, x="Data", y="Quantidade", markers=True, title="Vendas Diárias (Últimos 30 dias)")
         st.plotly_chart(fig_vendas, use_container_width=True)
     else:
@@ -391,31 +572,31 @@ def exibir_dashboard(db):
 
     # Status dos Pedidos
     st.markdown("### Status dos Pedidos")
-    pedidos = get_pedidos(db)
-    if pedidos:
-        status_counts = pd.Series([p.status for p in pedidos]).value_counts()
+    contagem_status = dados.get("status")
+    if contagem_status:
+        status_counts = pd.Series(contagem_status).sort_values(ascending=False)
         fig_status = px.pie(status_counts, values=status_counts.values, names=status_counts.index, title="Status dos Pedidos")
         st.plotly_chart(fig_status)
-    else:
+    elif contagem_status is not None:
         st.info("Nenhum pedido registrado.")
 
     # Quantidade Sugerida
-    st.markdown("### Quantidade Sugerida para Pedido (30 dias)")
-    fig_sugestoes = px.bar(df_sugestoes, x="Produto", y="Quantidade Sugerida", color="Produto",
-                           title="Sugestão de Reposição")
-    st.plotly_chart(fig_sugestoes, use_container_width=True)
+    if plano is not None:
+        st.markdown("### Quantidade Sugerida para Pedido (30 dias)")
+        urgentes = df_sugestoes[df_sugestoes["Quantidade Sugerida"] > 0].head(30)
+        fig_sugestoes = px.bar(urgentes, x="Produto", y="Quantidade Sugerida", color="Produto",
+                               title="Sugestão de Reposição (30 itens mais urgentes)")
+        st.plotly_chart(fig_sugestoes, use_container_width=True)
 
     # Top 5 Produtos mais Vendidos
     st.markdown("### Top 5 Produtos mais Vendidos (30 dias)")
-    vendas_por_produto = db.query(
-        Produto.nome,
-        func.sum(Venda.quantidade)
-    ).join(Venda).filter(
-        Venda.data_venda >= data_limite
-    ).group_by(Produto.nome).order_by(func.sum(Venda.quantidade).desc()).limit(5).all()
-
-    if vendas_por_produto:
-        df_top5 = pd.DataFrame(vendas_por_produto, columns=["Produto", "Quantidade Vendida"])
+    top5 = cubo.top_n(5)
+
+    if len(top5):
+        df_top5 = pd.DataFrame({
+            "Produto": [cubo.nomes[i] for i in top5],
+            "Quantidade Vendida": cubo.totais_produto()[top5]
+        })
         fig_top5 = px.bar(df_top5, x="Produto", y="Quantidade Vendida", color="Produto", title="Top 5 Produtos Vendidos")
         st.plotly_chart(fig_top5)
 
@@ -427,65 +608,58 @@ def exibir_dashboard(db):
 
     # Giro de Estoque
     st.markdown("### Análise de Giro de Estoque")
-    df['Giro Estoque (30 dias)'] = df['Média diária de vendas (últimos 30 dias)'] / df['Estoque Atual'].replace(0, 1)
+    df['Giro Estoque (30 dias)'] = cubo.giro_estoque()
     df_sorted = df.sort_values(by='Giro Estoque (30 dias)', ascending=False)
     st.dataframe(df_sorted)
 
     # Relatório de Vendas por Produto, Período e Fornecedor
     st.markdown("### Relatório de Vendas Personalizado")
-    produtos_opcoes = [p.nome for p in produtos]
-    produto_selecionado = st.selectbox("Produto:", ["Todos"] + produtos_opcoes)
-    fornecedores_opcoes = list({f.nome for f in get_fornecedores(db)})
-    fornecedor_selecionado = st.selectbox("Fornecedor:", ["Todos"] + fornecedores_opcoes)
-    data_ini = st.date_input("Data inicial", value=date.today() - timedelta(days=30))
-    data_fim = st.date_input("Data final", value=date.today())
-
-    query = db.query(Produto.nome.label("Produto"), Venda.data_venda.label("Data"), Venda.quantidade.label("Quantidade"),
-                     Fornecedor.nome.label("Fornecedor")).join(Venda).join(Fornecedor)
-    query = query.filter(Venda.data_venda.between(data_ini, data_fim))
-    if produto_selecionado != "Todos":
-        query = query.filter(Produto.nome == produto_selecionado)
-    if fornecedor_selecionado != "Todos":
-        query = query.filter(Fornecedor.nome == fornecedor_selecionado)
-
-    df_relatorio = pd.read_sql(query.statement, db.bind)
-    st.dataframe(df_relatorio)
-
-    from sklearn.linear_model import LinearRegression
-    import numpy as np
-    import plotly.graph_objects as go
-
-    # --- Vendas completas (últimos 30 dias) ---
-    data_limite = date.today() - timedelta(days=30)
-    vendas = db.query(Venda.data_venda, Produto.nome, func.sum(Venda.quantidade)).join(Produto).filter(
-        Venda.data_venda >= data_limite
-    ).group_by(Venda.data_venda, Produto.nome).order_by(Venda.data_venda).all()
-
-    if vendas:
-        df_sim = pd.DataFrame(vendas, columns=["Data", "Produto", "Quantidade"])
-        df_sim["Data"] = pd.to_datetime(df_sim["Data"])
-
-        produto_selecionado = st.selectbox("Selecione o produto para simulação de demanda:", df_sim["Produto"].unique())
-
-        df_item = df_sim[df_sim["Produto"] == produto_selecionado].copy()
-        df_item = df_item.set_index("Data").resample("D").sum().fillna(0)
-        df_item.reset_index(inplace=True)
-
-        # Média móvel
-        df_item["MediaMovel_7d"] = df_item["Quantidade"].rolling(window=7, min_periods=1).mean()
+    st.selectbox("Produto:", ["Todos"] + cubo.nomes, key="dash_rel_produto")
+    st.selectbox("Fornecedor:", ["Todos"] + dados.get("fornecedores", []) + [SEM_FORNECEDOR], key="dash_rel_fornecedor")
+    st.date_input("Data inicial", value=date.today() - timedelta(days=30), key="dash_rel_ini")
+    st.date_input("Data final", value=date.today(), key="dash_rel_fim")
+    st.selectbox("Agrupar:", list(AGRUPAMENTOS), format_func=AGRUPAMENTOS.get, key="dash_rel_agrupamento")
+    if espelho_disponivel():
+        st.radio("Fonte dos dados:", list(MOTORES), format_func=MOTORES.get, horizontal=True, key="dash_rel_motor")
+        if _motor_relatorio() == "duckdb":
+            st.caption(f"Espelho atualizado em {ler_marcas().get('atualizado_em', '-')}.")
+
+    if "relatorio" in dados:
+        previa, tem_mais = dados["relatorio"]
+        st.dataframe(previa)
+        if tem_mais:
+            st.caption(f"Prévia das primeiras {LINHAS_PREVIA} linhas. Exporte para obter o período completo.")
+        _exportacao_relatorio(_filtros_relatorio(), _motor_relatorio())
+
+    # --- Simulação de Demanda: previsão de todos os produtos de uma vez, cacheada por versão dos dados ---
+    st.markdown("### Simulação de Demanda")
+    col1, col2 = st.columns(2)
+    col1.select_slider("Histórico (dias)", options=[30, 60, 90, 180, 365], value=30, key="dash_historico")
+    col2.select_slider("Horizonte (dias)", options=[7, 14, 30, 60], value=14, key="dash_horizonte")
+    previsao = dados.get("previsao")
+    if previsao is None:
+        return
+    cubo_sim = previsao.cubo
+    # opções por id: nomes de produto não são únicos
+    com_vendas = [int(cubo_sim.produto_ids[i]) for i in cubo_sim.totais_produto().nonzero()[0]]
 
-        # Regressão linear
-        df_item["Dias"] = (df_item["Data"] - df_item["Data"].min()).dt.days
-        X = df_item[["Dias"]]
-        y = df_item["Quantidade"]
-        modelo = LinearRegression().fit(X, y)
-        df_item["Previsao_Linear"] = modelo.predict(X)
+    if com_vendas:
+        produto_id = st.selectbox("Selecione o produto para simulação de demanda:", com_vendas,
+                                  format_func=lambda p: cubo_sim.nomes[cubo_sim.indice_produto[p]])
+        i = cubo_sim.indice_produto[produto_id]
+        produto_selecionado = cubo_sim.nomes[i]
+        datas = cubo_sim.datas
 
-        # Gráfico interativo
         fig_sim = go.Figure()
-        fig_sim.add_trace(go.Scatter(x=df_item["Data"], y=df_item["Quantidade"], name="Real", mode="lines+markers"))
-        fig_sim.add_trace(go.Scatter(x=df_item["Data"], y=df_item["MediaMovel_7d"], name="Média Móvel 7d"))
-        fig_sim.add_trace(go.Scatter(x=df_item["Data"], y=df_item["Previsao_Linear"], name="Tendência das vendas"))
+        fig_sim.add_trace(go.Scatter(x=datas, y=cubo_sim.matriz[i], name="Real", mode="lines+markers"))
+        fig_sim.add_trace(go.Scatter(x=datas, y=previsao.media_movel[i], name="Média Móvel 7d"))
+        fig_sim.add_trace(go.Scatter(x=datas, y=previsao.suavizada[i], name="Suavização exponencial"))
+        fig_sim.add_trace(go.Scatter(x=datas, y=previsao.tendencia[i], name="Tendência das vendas"))
+        futuro = previsao.datas_futuras
+        fig_sim.add_trace(go.Scatter(x=futuro, y=previsao.previsao_tendencia[i], name="Previsão (tendência)",
+                                     line=dict(dash="dash")))
+        fig_sim.add_trace(go.Scatter(x=futuro, y=previsao.previsao_suavizada[i], name="Previsão (suavização)",
+                                     line=dict(dash="dot")))
         fig_sim.update_layout(title=f"Simulação de Demanda Futura - {produto_selecionado}")
         st.plotly_chart(fig_sim, use_container_width=True)
     else: